@@ -9,7 +9,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from app.database import Base
-from app.models import user, habit, checkin, point_record
+from app.models import user, habit, checkin, point_record, habit_stats, user_daily_stats, point_summary, stored_image
 from app.config import settings
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,84 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('openid', sa.String(length=100), nullable=False),
+    sa.Column('nickname', sa.String(length=50), nullable=True),
+    sa.Column('avatar', sa.String(length=200), nullable=True),
+    sa.Column('points', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_openid'), 'users', ['openid'], unique=True)
+    op.create_table('habits',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('icon', sa.String(length=50), nullable=True),
+    sa.Column('category', sa.String(length=20), nullable=True),
+    sa.Column('frequency', sa.Enum('daily', 'weekly', 'custom', name='habitfrequency'), nullable=True),
+    sa.Column('reminder_time', sa.Time(), nullable=True),
+    sa.Column('status', sa.Enum('active', 'paused', 'deleted', name='habitstatus'), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_habits_id'), 'habits', ['id'], unique=False)
+    op.create_table('point_records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Enum('earn', 'spend', name='pointtype'), nullable=False),
+    sa.Column('reason', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_point_records_id'), 'point_records', ['id'], unique=False)
+    op.create_table('checkins',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('checkin_date', sa.Date(), nullable=False),
+    sa.Column('checkin_time', sa.DateTime(), nullable=True),
+    sa.Column('note', sa.Text(), nullable=True),
+    sa.Column('image', sa.String(length=200), nullable=True),
+    sa.Column('is_makeup', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('habit_id', 'checkin_date', name='unique_habit_date_checkin')
+    )
+    op.create_index(op.f('ix_checkins_id'), 'checkins', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_checkins_id'), table_name='checkins')
+    op.drop_table('checkins')
+    op.drop_index(op.f('ix_point_records_id'), table_name='point_records')
+    op.drop_table('point_records')
+    op.drop_index(op.f('ix_habits_id'), table_name='habits')
+    op.drop_table('habits')
+    op.drop_index(op.f('ix_users_openid'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
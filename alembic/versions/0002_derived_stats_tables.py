@@ -0,0 +1,55 @@
+"""Add derived statistics tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('habit_stats',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('total_checkins', sa.Integer(), nullable=False),
+    sa.Column('last_checkin_date', sa.Date(), nullable=True),
+    sa.Column('last_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_streak', sa.Integer(), nullable=False),
+    sa.Column('recent_days', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ),
+    sa.PrimaryKeyConstraint('habit_id')
+    )
+    op.create_table('user_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('checkins', sa.Integer(), nullable=False),
+    sa.Column('active_habit_count', sa.Integer(), nullable=True),
+    sa.Column('points_earned', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+    op.create_table('user_point_summaries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_earned_date', sa.Date(), nullable=False),
+    sa.Column('earned_today', sa.Integer(), nullable=False),
+    sa.Column('earned_this_week', sa.Integer(), nullable=False),
+    sa.Column('earned_this_month', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_point_summaries')
+    op.drop_table('user_daily_stats')
+    op.drop_table('habit_stats')
@@ -0,0 +1,30 @@
+"""Add composite indexes for hot query paths
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_checkins_user_id_checkin_date', 'checkins', ['user_id', 'checkin_date'], unique=False)
+    op.create_index('ix_point_records_user_id_created_at', 'point_records', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_point_records_user_id_type_created_at', 'point_records', ['user_id', 'type', 'created_at'], unique=False)
+    op.create_index('ix_habits_user_id_status', 'habits', ['user_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_habits_user_id_status', table_name='habits')
+    op.drop_index('ix_point_records_user_id_type_created_at', table_name='point_records')
+    op.drop_index('ix_point_records_user_id_created_at', table_name='point_records')
+    op.drop_index('ix_checkins_user_id_checkin_date', table_name='checkins')
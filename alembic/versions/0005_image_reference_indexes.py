@@ -0,0 +1,26 @@
+"""Index image paths for upload garbage collection
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_checkins_image', 'checkins', ['image'], unique=False)
+    op.create_index(op.f('ix_users_avatar'), 'users', ['avatar'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_avatar'), table_name='users')
+    op.drop_index('ix_checkins_image', table_name='checkins')
@@ -0,0 +1,55 @@
+"""Store the file names of image paths for upload garbage collection
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def backfill_names(table: str, path_column: str, name_column: str) -> None:
+    """Fill a name column from the last segment of its path column, a batch of rows at a time"""
+    conn = op.get_bind()
+    rows = sa.table(table, sa.column('id'), sa.column(path_column), sa.column(name_column))
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(rows.c.id, rows.c[path_column])
+            .where(rows.c.id > last_id, rows.c[path_column].isnot(None))
+            .order_by(rows.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        conn.execute(
+            rows.update().where(rows.c.id == sa.bindparam('row_id')),
+            [{'row_id': row_id, name_column: path.rsplit('/', 1)[-1]} for row_id, path in batch]
+        )
+        last_id = batch[-1][0]
+
+
+def upgrade() -> None:
+    op.add_column('checkins', sa.Column('image_name', sa.String(length=100), nullable=True))
+    op.add_column('users', sa.Column('avatar_name', sa.String(length=100), nullable=True))
+    backfill_names('checkins', 'image', 'image_name')
+    backfill_names('users', 'avatar', 'avatar_name')
+    op.create_index('ix_checkins_image_name', 'checkins', ['image_name'], unique=False)
+    op.create_index(op.f('ix_users_avatar_name'), 'users', ['avatar_name'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_avatar_name'), table_name='users')
+    op.drop_index('ix_checkins_image_name', table_name='checkins')
+    op.drop_column('users', 'avatar_name')
+    op.drop_column('checkins', 'image_name')
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import WeChatLoginRequest, TokenResponse, UserResponse
+from app.services.user_cache import user_cache
+from app.services.user_service import UserService
 from app.utils.auth import get_wechat_openid, create_access_token
 from app.utils.dependencies import get_current_user
 
@@ -12,7 +14,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/login", response_model=TokenResponse)
 async def wechat_login(
     login_data: WeChatLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """WeChat mini-program login"""
     # Get openid from WeChat
@@ -23,27 +25,10 @@ async def wechat_login(
             detail="Invalid WeChat code"
         )
     
-    # Check if user exists
-    user = db.query(User).filter(User.openid == openid).first()
-    
-    if not user:
-        # Create new user
-        user = User(
-            openid=openid,
-            nickname=login_data.nickname,
-            avatar=login_data.avatar
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    else:
-        # Update user info if provided
-        if login_data.nickname:
-            user.nickname = login_data.nickname
-        if login_data.avatar:
-            user.avatar = login_data.avatar
-        db.commit()
-        db.refresh(user)
+    # Create or update the user in a single upsert, skipped when nothing changed
+    user, written = await UserService(db).login(openid, login_data.nickname, login_data.avatar)
+    if written:
+        await user_cache.invalidate(user.id)
     
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
@@ -51,7 +36,7 @@ async def wechat_login(
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        user=UserResponse.from_orm(user)
+        user=UserResponse.model_validate(user)
     )
 
 
@@ -60,4 +45,4 @@ async def get_current_user_info(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user information"""
-    return UserResponse.from_orm(current_user)
+    return UserResponse.model_validate(current_user)
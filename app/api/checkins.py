@@ -1,56 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from typing import List, Optional
-from datetime import date, datetime, timedelta
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Dict, Iterable, List, Optional, Union
+from datetime import date, timedelta
 from app.database import get_db
 from app.models.user import User
 from app.models.habit import Habit, HabitStatus
 from app.models.checkin import Checkin
-from app.schemas.checkin import CheckinCreate, CheckinResponse, MakeupCheckinRequest
+from app.models.habit_stats import HabitStat
+from app.schemas.checkin import (
+    CheckinCreate, CheckinResponse, CheckinPage, MakeupCheckinRequest,
+    CheckinBatchCreate, CheckinBatchResult, CheckinBatchResponse, CalendarRange, HabitCalendar,
+    MAX_CALENDAR_DAYS, MAX_CALENDAR_HABITS
+)
+from app.services.checkin_index import checkin_index
+from app.services.daily_stats_service import DailyStatsService
+from app.services.habit_stats_service import HabitStatsService
+from app.services.image_service import ImageService
 from app.services.point_service import PointService
+from app.services.user_cache import user_cache
 from app.utils.dependencies import get_current_user
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, keyset_page, split_page
+from app.utils.serialization import row_dicts, schema_columns
 
 router = APIRouter(prefix="/checkins", tags=["Check-ins"])
 
+# Columns listed by CheckinResponse, so pages are built straight from rows
+CHECKIN_COLUMNS = schema_columns(Checkin, CheckinResponse)
 
-@router.get("/", response_model=List[CheckinResponse])
+
+@router.get("/", response_model=CheckinPage)
 async def get_checkins(
     habit_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get check-in records with optional filters"""
-    query = db.query(Checkin).filter(Checkin.user_id == current_user.id)
+    """Get check-in records with optional filters, newest first, one page at a time"""
+    query = select(*CHECKIN_COLUMNS).where(Checkin.user_id == current_user.id)
     
     if habit_id:
-        query = query.filter(Checkin.habit_id == habit_id)
+        query = query.where(Checkin.habit_id == habit_id)
     
     if start_date:
-        query = query.filter(Checkin.checkin_date >= start_date)
+        query = query.where(Checkin.checkin_date >= start_date)
     
     if end_date:
-        query = query.filter(Checkin.checkin_date <= end_date)
+        query = query.where(Checkin.checkin_date <= end_date)
+    
+    after = decode_cursor(cursor, date.fromisoformat) if cursor else None
+    rows = (await db.execute(
+        keyset_page(query, Checkin.checkin_date, Checkin.id, limit, after)
+    )).all()
+    rows, next_cursor = split_page(rows, limit, "checkin_date")
     
-    checkins = query.order_by(Checkin.checkin_date.desc()).all()
-    return [CheckinResponse.from_orm(checkin) for checkin in checkins]
+    # Rows already have CheckinResponse's fields and types, orjson serializes them as they are
+    return ORJSONResponse({"items": row_dicts(rows), "next_cursor": next_cursor})
 
 
 @router.post("/", response_model=CheckinResponse)
 async def create_checkin(
     checkin_data: CheckinCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new check-in"""
     # Verify habit belongs to user
-    habit = db.query(Habit).filter(
-        Habit.id == checkin_data.habit_id,
-        Habit.user_id == current_user.id,
-        Habit.status == HabitStatus.active
-    ).first()
+    habit = await db.scalar(
+        select(Habit).where(
+            Habit.id == checkin_data.habit_id,
+            Habit.user_id == current_user.id,
+            Habit.status == HabitStatus.active
+        )
+    )
     
     if not habit:
         raise HTTPException(
@@ -59,12 +86,12 @@ async def create_checkin(
         )
     
     # Check if already checked in for this date
-    existing_checkin = db.query(Checkin).filter(
-        and_(
+    existing_checkin = await db.scalar(
+        select(Checkin.id).where(
             Checkin.habit_id == checkin_data.habit_id,
             Checkin.checkin_date == checkin_data.checkin_date
         )
-    ).first()
+    )
     
     if existing_checkin:
         raise HTTPException(
@@ -75,33 +102,141 @@ async def create_checkin(
     # Create check-in
     checkin = Checkin(
         user_id=current_user.id,
-        **checkin_data.dict()
+        **checkin_data.model_dump()
     )
     db.add(checkin)
-    db.commit()
-    db.refresh(checkin)
+    await db.flush()
+    habit_stats = HabitStatsService(db)
+    stats = await habit_stats.record_checkin(habit.id, checkin.checkin_date)
+    active_habits = await DailyStatsService(db).record_checkin(current_user.id, checkin.checkin_date)
+    await ImageService(db).add_reference(checkin.image)
     
-    # Calculate and award points
+    # Calculate and award points in the same transaction
     point_service = PointService(db)
-    points_earned = point_service.calculate_checkin_points(current_user.id, checkin_data.habit_id)
-    point_service.add_points(current_user.id, points_earned, "daily_checkin")
+    points_earned = await point_service.calculate_checkin_points(
+        current_user.id,
+        await habit_stats.get_current_streak(stats, date.today()),
+        active_habits
+    )
+    await point_service.credit(current_user.id, points_earned, "daily_checkin")
+    
+    await db.commit()
+    await db.refresh(checkin)
+    await checkin_index.mark([(checkin.habit_id, checkin.checkin_date)])
+    await user_cache.invalidate(current_user.id)
     
-    return CheckinResponse.from_orm(checkin)
+    return CheckinResponse.model_validate(checkin)
+
+
+@router.post("/batch", response_model=CheckinBatchResponse)
+async def create_checkins_batch(
+    batch: CheckinBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create check-ins for several habits at once, with the same rules as one POST /checkins per item"""
+    # Verify all habits belong to user with one query
+    habits = {
+        habit.id: habit
+        for habit in await db.scalars(
+            select(Habit).where(
+                Habit.id.in_({item.habit_id for item in batch.items}),
+                Habit.user_id == current_user.id,
+                Habit.status == HabitStatus.active
+            )
+        )
+    }
+    
+    # Find the requested days already checked in with one query
+    taken = set()
+    if habits:
+        taken = {
+            (habit_id, checkin_date)
+            for habit_id, checkin_date in await db.execute(
+                select(Checkin.habit_id, Checkin.checkin_date).where(
+                    Checkin.habit_id.in_(habits),
+                    Checkin.checkin_date.in_({item.checkin_date for item in batch.items})
+                )
+            )
+        }
+    
+    # A check-in or the error POST /checkins would have returned, per item
+    outcomes: List[Union[Checkin, str]] = []
+    checkins = []
+    for item in batch.items:
+        if item.habit_id not in habits:
+            outcomes.append("Habit not found")
+        elif (item.habit_id, item.checkin_date) in taken:
+            outcomes.append("Already checked in for this date")
+        else:
+            taken.add((item.habit_id, item.checkin_date))
+            checkin = Checkin(user_id=current_user.id, **item.model_dump())
+            checkins.append(checkin)
+            outcomes.append(checkin)
+    
+    points_earned = 0
+    if checkins:
+        db.add_all(checkins)
+        await db.flush()
+        
+        # Stats and points are worked out per check-in in request order, as separate requests would
+        habit_stats = HabitStatsService(db)
+        daily_stats = DailyStatsService(db)
+        image_service = ImageService(db)
+        point_service = PointService(db)
+        active_habits = await daily_stats.count_active_habits(current_user.id)
+        for checkin in checkins:
+            stats = await habit_stats.record_checkin(checkin.habit_id, checkin.checkin_date)
+            await daily_stats.record_checkin(current_user.id, checkin.checkin_date, active_habits)
+            await image_service.add_reference(checkin.image)
+            points_earned += await point_service.calculate_checkin_points(
+                current_user.id,
+                await habit_stats.get_current_streak(stats, date.today()),
+                active_habits
+            )
+        
+        # Award the points of the whole batch at once
+        await point_service.credit(current_user.id, points_earned, "daily_checkin")
+        await db.commit()
+        
+        # Load the server-set columns of every new row in one query
+        (await db.scalars(
+            select(Checkin)
+            .where(Checkin.id.in_([checkin.id for checkin in checkins]))
+            .execution_options(populate_existing=True)
+        )).all()
+        await checkin_index.mark((checkin.habit_id, checkin.checkin_date) for checkin in checkins)
+        await user_cache.invalidate(current_user.id)
+    
+    return CheckinBatchResponse(
+        items=[
+            CheckinBatchResult(
+                habit_id=item.habit_id,
+                checkin_date=item.checkin_date,
+                checkin=CheckinResponse.model_validate(outcome) if isinstance(outcome, Checkin) else None,
+                error=outcome if isinstance(outcome, str) else None
+            )
+            for item, outcome in zip(batch.items, outcomes)
+        ],
+        points_earned=points_earned
+    )
 
 
 @router.post("/makeup", response_model=CheckinResponse)
 async def makeup_checkin(
     makeup_data: MakeupCheckinRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a makeup check-in (costs points)"""
     # Verify habit belongs to user
-    habit = db.query(Habit).filter(
-        Habit.id == makeup_data.habit_id,
-        Habit.user_id == current_user.id,
-        Habit.status == HabitStatus.active
-    ).first()
+    habit = await db.scalar(
+        select(Habit).where(
+            Habit.id == makeup_data.habit_id,
+            Habit.user_id == current_user.id,
+            Habit.status == HabitStatus.active
+        )
+    )
     
     if not habit:
         raise HTTPException(
@@ -124,12 +259,12 @@ async def makeup_checkin(
         )
     
     # Check if already checked in for this date
-    existing_checkin = db.query(Checkin).filter(
-        and_(
+    existing_checkin = await db.scalar(
+        select(Checkin.id).where(
             Checkin.habit_id == makeup_data.habit_id,
             Checkin.checkin_date == makeup_data.checkin_date
         )
-    ).first()
+    )
     
     if existing_checkin:
         raise HTTPException(
@@ -137,23 +272,16 @@ async def makeup_checkin(
             detail="Already checked in for this date"
         )
     
-    # Check if user has enough points
+    # Spend points, failing if the user does not have enough
     makeup_cost = 20
     point_service = PointService(db)
     
-    if current_user.points < makeup_cost:
+    if not await point_service.debit(current_user.id, makeup_cost, "makeup_checkin"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Insufficient points for makeup check-in"
         )
     
-    # Spend points
-    if not point_service.spend_points(current_user.id, makeup_cost, "makeup_checkin"):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Failed to process point transaction"
-        )
-    
     # Create makeup check-in
     checkin = Checkin(
         user_id=current_user.id,
@@ -162,10 +290,117 @@ async def makeup_checkin(
         is_makeup=True
     )
     db.add(checkin)
-    db.commit()
-    db.refresh(checkin)
+    await db.flush()
+    await HabitStatsService(db).record_checkin(habit.id, checkin.checkin_date)
+    await DailyStatsService(db).record_checkin(current_user.id, checkin.checkin_date)
+    await db.commit()
+    await db.refresh(checkin)
+    await checkin_index.mark([(checkin.habit_id, checkin.checkin_date)])
+    await user_cache.invalidate(current_user.id)
     
-    return CheckinResponse.from_orm(checkin)
+    return CheckinResponse.model_validate(checkin)
+
+
+def encode_day_mask(offsets: Iterable[int], days: int) -> str:
+    """Base64 bitmask with bit N set for each day offset N, first day in the highest bit"""
+    mask = bytearray((days + 7) // 8)
+    for offset in offsets:
+        mask[offset // 8] |= 0x80 >> (offset % 8)
+    return base64.b64encode(mask).decode()
+
+
+@router.get("/calendar", response_model=CalendarRange)
+async def get_checkin_calendars(
+    start_date: date,
+    end_date: date,
+    # Not a required parameter: FastAPI fails to render the 422 of a missing required list
+    habit_ids: List[int] = Query([], max_length=MAX_CALENDAR_HABITS),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get compact check-in calendars of several habits over a date range of up to a year"""
+    if not habit_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one habit_ids value is required"
+        )
+    
+    days = (end_date - start_date).days + 1
+    if days < 1 or days > MAX_CALENDAR_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must cover 1 to {MAX_CALENDAR_DAYS} days"
+        )
+    
+    # Verify habits belong to user
+    habit_ids = list(dict.fromkeys(habit_ids))
+    owned = set(await db.scalars(
+        select(Habit.id).where(
+            Habit.id.in_(habit_ids),
+            Habit.user_id == current_user.id
+        )
+    ))
+    
+    if len(owned) != len(habit_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found"
+        )
+    
+    # Only the date and flag columns, notes and images come from the detail endpoint
+    checked: Dict[int, List[int]] = {habit_id: [] for habit_id in habit_ids}
+    makeup: Dict[int, List[int]] = {habit_id: [] for habit_id in habit_ids}
+    rows = await db.execute(
+        select(Checkin.habit_id, Checkin.checkin_date, Checkin.is_makeup).where(
+            Checkin.habit_id.in_(habit_ids),
+            Checkin.checkin_date >= start_date,
+            Checkin.checkin_date <= end_date
+        )
+    )
+    for habit_id, checkin_date, is_makeup in rows:
+        offset = (checkin_date - start_date).days
+        checked[habit_id].append(offset)
+        if is_makeup:
+            makeup[habit_id].append(offset)
+    
+    return CalendarRange(
+        start_date=start_date,
+        end_date=end_date,
+        days=days,
+        habits=[
+            HabitCalendar(
+                habit_id=habit_id,
+                checked=encode_day_mask(checked[habit_id], days),
+                makeup=encode_day_mask(makeup[habit_id], days)
+            )
+            for habit_id in habit_ids
+        ]
+    )
+
+
+@router.get("/calendar/{habit_id}/{checkin_date}", response_model=CheckinResponse)
+async def get_calendar_day(
+    habit_id: int,
+    checkin_date: date,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the check-in of a habit on one day, with its note and image"""
+    checkin = await db.scalar(
+        select(Checkin).where(
+            Checkin.habit_id == habit_id,
+            Checkin.checkin_date == checkin_date,
+            Checkin.user_id == current_user.id
+        )
+    )
+    
+    if not checkin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Check-in not found"
+        )
+    
+    return CheckinResponse.model_validate(checkin)
 
 
 @router.get("/calendar/{habit_id}")
@@ -174,20 +409,25 @@ async def get_checkin_calendar(
     year: int,
     month: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get check-in calendar for a specific habit and month"""
-    # Verify habit belongs to user
-    habit = db.query(Habit).filter(
-        Habit.id == habit_id,
-        Habit.user_id == current_user.id
-    ).first()
+    # Verify habit belongs to user, with its check-in count to validate the bitmap against
+    found = (await db.execute(
+        select(Habit, HabitStat.total_checkins)
+        .outerjoin(HabitStat, HabitStat.habit_id == Habit.id)
+        .where(
+            Habit.id == habit_id,
+            Habit.user_id == current_user.id
+        )
+    )).first()
     
-    if not habit:
+    if not found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Habit not found"
         )
+    habit, total_checkins = found
     
     # Get checkins for the month
     start_date = date(year, month, 1)
@@ -196,13 +436,16 @@ async def get_checkin_calendar(
     else:
         end_date = date(year, month + 1, 1) - timedelta(days=1)
     
-    checkins = db.query(Checkin).filter(
-        and_(
-            Checkin.habit_id == habit_id,
-            Checkin.checkin_date >= start_date,
-            Checkin.checkin_date <= end_date
-        )
-    ).all()
+    # The bitmap answers empty months without touching the checkins table
+    checkins = []
+    if await checkin_index.count_checkins(db, habit, start_date, end_date, total_checkins) != 0:
+        checkins = (await db.scalars(
+            select(Checkin).where(
+                Checkin.habit_id == habit_id,
+                Checkin.checkin_date >= start_date,
+                Checkin.checkin_date <= end_date
+            )
+        )).all()
     
     # Format calendar data
     calendar_data = {}
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from datetime import date
+from app.models.user import User
+from app.services.export_service import ExportDataset, ExportFormat, ExportService
+from app.utils.dependencies import get_current_user
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+@router.get("/")
+async def export_history(
+    format: ExportFormat = ExportFormat.ndjson,
+    dataset: ExportDataset = ExportDataset.all,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the user's habits, check-ins and point records as NDJSON or CSV"""
+    if format == ExportFormat.csv and dataset == ExportDataset.all:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV export needs a single dataset"
+        )
+    
+    service = ExportService(current_user.id)
+    content = service.stream_csv(dataset) if format == ExportFormat.csv else service.stream_ndjson(dataset)
+    filename = f"habit-tracker-{dataset.value}-{date.today().isoformat()}.{format.value}"
+    
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,54 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List
 from datetime import date, timedelta
 from app.database import get_db
 from app.models.user import User
 from app.models.habit import Habit, HabitStatus
-from app.models.checkin import Checkin
 from app.schemas.habit import HabitCreate, HabitUpdate, HabitResponse, HabitWithStats
+from app.services.checkin_index import checkin_index
+from app.services.habit_stats_service import HabitStatsService, count_recent_checkins
+from app.services.stats_cache import stats_cache
 from app.utils.dependencies import get_current_user
+from app.utils.etag import conditional_response, user_data_etag
+from app.utils.serialization import fields_of
 
 router = APIRouter(prefix="/habits", tags=["Habits"])
 
 
 @router.get("/", response_model=List[HabitWithStats])
 async def get_habits(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's habits with statistics"""
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.status == HabitStatus.active
-    ).all()
+    not_modified = conditional_response(request, response, user_data_etag(request, "habits", current_user.id))
+    if not_modified:
+        return not_modified
+    
+    today = date.today()
+    thirty_days_ago = today - timedelta(days=30)
+    total_days = 30
+    
+    service = HabitStatsService(db)
+    habits = await service.get_active_habits_with_stats(current_user.id)
+    streaks = await service.get_current_streaks([habit_stats for _, habit_stats in habits], today)
     
     habits_with_stats = []
-    for habit in habits:
-        # Calculate statistics
-        total_checkins = db.query(Checkin).filter(Checkin.habit_id == habit.id).count()
-        
-        # Calculate current streak
-        current_streak = calculate_current_streak(db, habit.id)
+    for habit, habit_stats in habits:
+        total_checkins = habit_stats.total_checkins
+        current_streak = streaks[habit.id]
+        checkin_days = count_recent_checkins(habit_stats, thirty_days_ago)
         
         # Calculate completion rate (last 30 days)
-        thirty_days_ago = date.today() - timedelta(days=30)
-        total_days = 30
-        checkin_days = db.query(Checkin).filter(
-            Checkin.habit_id == habit.id,
-            Checkin.checkin_date >= thirty_days_ago
-        ).count()
         completion_rate = (checkin_days / total_days) * 100 if total_days > 0 else 0
         
-        habit_data = HabitResponse.from_orm(habit)
-        habits_with_stats.append(HabitWithStats(
-            **habit_data.dict(),
-            total_checkins=total_checkins,
-            current_streak=current_streak,
-            completion_rate=completion_rate
-        ))
+        habits_with_stats.append({
+            **fields_of(habit, HabitResponse),
+            "total_checkins": total_checkins,
+            "current_streak": current_streak,
+            "completion_rate": completion_rate
+        })
     
+    # Plain dicts, validated once against response_model instead of per habit first
     return habits_with_stats
 
 
@@ -56,30 +61,35 @@ async def get_habits(
 async def create_habit(
     habit_data: HabitCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new habit"""
     habit = Habit(
         user_id=current_user.id,
-        **habit_data.dict()
+        **habit_data.model_dump()
     )
     db.add(habit)
-    db.commit()
-    db.refresh(habit)
-    return HabitResponse.from_orm(habit)
+    await db.commit()
+    await db.refresh(habit)
+    await checkin_index.init_habit(habit)
+    
+    await stats_cache.invalidate(current_user.id)
+    return HabitResponse.model_validate(habit)
 
 
 @router.get("/{habit_id}", response_model=HabitResponse)
 async def get_habit(
     habit_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific habit"""
-    habit = db.query(Habit).filter(
-        Habit.id == habit_id,
-        Habit.user_id == current_user.id
-    ).first()
+    habit = await db.scalar(
+        select(Habit).where(
+            Habit.id == habit_id,
+            Habit.user_id == current_user.id
+        )
+    )
     
     if not habit:
         raise HTTPException(
@@ -87,7 +97,7 @@ async def get_habit(
             detail="Habit not found"
         )
     
-    return HabitResponse.from_orm(habit)
+    return HabitResponse.model_validate(habit)
 
 
 @router.put("/{habit_id}", response_model=HabitResponse)
@@ -95,13 +105,15 @@ async def update_habit(
     habit_id: int,
     habit_data: HabitUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a habit"""
-    habit = db.query(Habit).filter(
-        Habit.id == habit_id,
-        Habit.user_id == current_user.id
-    ).first()
+    habit = await db.scalar(
+        select(Habit).where(
+            Habit.id == habit_id,
+            Habit.user_id == current_user.id
+        )
+    )
     
     if not habit:
         raise HTTPException(
@@ -110,25 +122,28 @@ async def update_habit(
         )
     
     # Update fields
-    for field, value in habit_data.dict(exclude_unset=True).items():
+    for field, value in habit_data.model_dump(exclude_unset=True).items():
         setattr(habit, field, value)
     
-    db.commit()
-    db.refresh(habit)
-    return HabitResponse.from_orm(habit)
+    await db.commit()
+    await db.refresh(habit)
+    await stats_cache.invalidate(current_user.id)
+    return HabitResponse.model_validate(habit)
 
 
 @router.delete("/{habit_id}")
 async def delete_habit(
     habit_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a habit (soft delete)"""
-    habit = db.query(Habit).filter(
-        Habit.id == habit_id,
-        Habit.user_id == current_user.id
-    ).first()
+    habit = await db.scalar(
+        select(Habit).where(
+            Habit.id == habit_id,
+            Habit.user_id == current_user.id
+        )
+    )
     
     if not habit:
         raise HTTPException(
@@ -137,27 +152,8 @@ async def delete_habit(
         )
     
     habit.status = HabitStatus.deleted
-    db.commit()
+    await db.commit()
+    await stats_cache.invalidate(current_user.id)
     
     return {"message": "Habit deleted successfully"}
 
-
-def calculate_current_streak(db: Session, habit_id: int) -> int:
-    """Calculate current streak for a habit"""
-    today = date.today()
-    streak = 0
-    current_date = today
-    
-    while True:
-        checkin = db.query(Checkin).filter(
-            Checkin.habit_id == habit_id,
-            Checkin.checkin_date == current_date
-        ).first()
-        
-        if checkin:
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
-    
-    return streak
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import FileResponse, RedirectResponse
+from typing import Optional
+from app.utils.image_variants import image_variants
+from app.utils.storage import IMMUTABLE_CACHE_CONTROL, storage
+
+router = APIRouter(prefix="/uploads", tags=["Images"])
+
+
+@router.get("/images/{path:path}")
+async def get_image(path: str, w: Optional[int] = None, fmt: Optional[str] = None):
+    """Serve an uploaded image, resized to width w (and converted to fmt) when asked"""
+    if w is None:
+        key = await image_variants.original_key(path)
+        local_path = storage.local_path(key)
+        if local_path is None:
+            return RedirectResponse(storage.url(key))
+    else:
+        local_path = await image_variants.get(path, w, fmt)
+    
+    return FileResponse(local_path, headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from typing import List
-from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from pydantic import TypeAdapter
+from typing import List, Optional
+from datetime import datetime
 from app.database import get_db
 from app.models.user import User
-from app.models.point_record import PointRecord, PointType
-from app.schemas.point import PointRecordResponse, PointSummary, RewardItem, ExchangeRequest
+from app.models.point_record import PointRecord
+from app.schemas.point import PointRecordResponse, PointRecordPage, PointSummary, RewardItem, ExchangeRequest
 from app.services.point_service import PointService
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_user, get_current_user_fresh
+from app.utils.etag import conditional_response, content_etag
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, keyset_page, split_page
+from app.utils.serialization import row_dicts, schema_columns
 
 router = APIRouter(prefix="/points", tags=["Points & Rewards"])
 
+# Columns listed by PointRecordResponse, so pages are built straight from rows
+POINT_RECORD_COLUMNS = schema_columns(PointRecord, PointRecordResponse)
+
 # Predefined reward items
 REWARD_ITEMS = [
     RewardItem(
@@ -72,78 +80,66 @@ REWARD_ITEMS = [
     )
 ]
 
+# The reward list only changes with a deploy, so clients may keep it for a day
+REWARDS_ETAG = content_etag(TypeAdapter(List[RewardItem]).dump_json(REWARD_ITEMS))
+REWARDS_CACHE_CONTROL = "public, max-age=86400"
+
 
 @router.get("/summary", response_model=PointSummary)
 async def get_point_summary(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's point summary"""
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
-    
-    # Points earned today
-    earned_today = db.query(func.sum(PointRecord.points)).filter(
-        and_(
-            PointRecord.user_id == current_user.id,
-            PointRecord.type == PointType.earn,
-            func.date(PointRecord.created_at) == today
-        )
-    ).scalar() or 0
-    
-    # Points earned this week
-    earned_this_week = db.query(func.sum(PointRecord.points)).filter(
-        and_(
-            PointRecord.user_id == current_user.id,
-            PointRecord.type == PointType.earn,
-            func.date(PointRecord.created_at) >= week_start
-        )
-    ).scalar() or 0
-    
-    # Points earned this month
-    earned_this_month = db.query(func.sum(PointRecord.points)).filter(
-        and_(
-            PointRecord.user_id == current_user.id,
-            PointRecord.type == PointType.earn,
-            func.date(PointRecord.created_at) >= month_start
-        )
-    ).scalar() or 0
+    earned = await PointService(db).get_earned_points(current_user.id)
     
     return PointSummary(
         total_points=current_user.points,
-        earned_today=earned_today,
-        earned_this_week=earned_this_week,
-        earned_this_month=earned_this_month
+        earned_today=earned.today,
+        earned_this_week=earned.this_week,
+        earned_this_month=earned.this_month
     )
 
 
-@router.get("/history", response_model=List[PointRecordResponse])
+@router.get("/history", response_model=PointRecordPage)
 async def get_point_history(
-    limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get user's point transaction history"""
-    records = db.query(PointRecord).filter(
-        PointRecord.user_id == current_user.id
-    ).order_by(PointRecord.created_at.desc()).offset(offset).limit(limit).all()
+    """Get user's point transaction history, newest first, one page at a time"""
+    after = decode_cursor(cursor, datetime.fromisoformat) if cursor else None
+    rows = (await db.execute(
+        keyset_page(
+            select(*POINT_RECORD_COLUMNS).where(PointRecord.user_id == current_user.id),
+            PointRecord.created_at,
+            PointRecord.id,
+            limit,
+            after
+        )
+    )).all()
+    rows, next_cursor = split_page(rows, limit, "created_at")
     
-    return [PointRecordResponse.from_orm(record) for record in records]
+    # Rows already have PointRecordResponse's fields and types, orjson serializes them as they are
+    return ORJSONResponse({"items": row_dicts(rows), "next_cursor": next_cursor})
 
 
 @router.get("/rewards", response_model=List[RewardItem])
-async def get_available_rewards():
+async def get_available_rewards(request: Request, response: Response):
     """Get available reward items"""
+    not_modified = conditional_response(request, response, REWARDS_ETAG, REWARDS_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    
     return REWARD_ITEMS
 
 
 @router.post("/exchange")
 async def exchange_reward(
     exchange_data: ExchangeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_fresh),
+    db: AsyncSession = Depends(get_db)
 ):
     """Exchange points for rewards"""
     # Find reward item
@@ -168,7 +164,7 @@ async def exchange_reward(
     
     # Process exchange
     point_service = PointService(db)
-    success = point_service.spend_points(
+    success = await point_service.spend_points(
         current_user.id,
         reward.cost,
         f"exchange_{reward.id}"
@@ -183,5 +179,5 @@ async def exchange_reward(
     return {
         "message": f"Successfully exchanged {reward.name}",
         "reward": reward,
-        "remaining_points": current_user.points - reward.cost
+        "remaining_points": current_user.points
     }
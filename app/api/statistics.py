@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from pydantic import TypeAdapter
 from typing import List, Dict, Any
 from datetime import date, datetime, timedelta
 from app.database import get_db
@@ -8,35 +9,86 @@ from app.models.user import User
 from app.models.habit import Habit, HabitStatus
 from app.models.checkin import Checkin
 from app.schemas.statistics import UserStatistics, HabitStats, DailyStats, TrendData
+from app.services.daily_stats_service import DailyStatsService
+from app.services.habit_stats_service import HabitStatsService, count_recent_checkins
+from app.services.stats_cache import stats_cache
 from app.utils.dependencies import get_current_user
+from app.utils.etag import conditional_response, user_data_etag
 
 router = APIRouter(prefix="/statistics", tags=["Statistics"])
 
 
+# Adapters used to (de)serialize cached responses
+overview_adapter = TypeAdapter(UserStatistics)
+habit_stats_adapter = TypeAdapter(List[HabitStats])
+
+
 @router.get("/overview", response_model=UserStatistics)
 async def get_user_statistics(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's overall statistics"""
+    not_modified = conditional_response(request, response, user_data_etag(request, "overview", current_user.id))
+    if not_modified:
+        return not_modified
+    
+    return await stats_cache.get_or_compute(
+        "overview",
+        current_user.id,
+        overview_adapter,
+        lambda: compute_user_statistics(db, current_user)
+    )
+
+
+@router.get("/habits", response_model=List[HabitStats])
+async def get_habit_statistics(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get statistics for all user habits"""
+    not_modified = conditional_response(request, response, user_data_etag(request, "habit-stats", current_user.id))
+    if not_modified:
+        return not_modified
+    
+    return await stats_cache.get_or_compute(
+        "habits",
+        current_user.id,
+        habit_stats_adapter,
+        lambda: compute_habit_statistics(db, current_user.id)
+    )
+
+
+async def compute_user_statistics(db: AsyncSession, current_user: User) -> UserStatistics:
+    """Compute user's overall statistics"""
     # Total and active habits
-    total_habits = db.query(Habit).filter(Habit.user_id == current_user.id).count()
-    active_habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.status == HabitStatus.active
-    ).count()
+    total_habits = await db.scalar(
+        select(func.count(Habit.id)).where(Habit.user_id == current_user.id)
+    )
+    active_habits = await db.scalar(
+        select(func.count(Habit.id)).where(
+            Habit.user_id == current_user.id,
+            Habit.status == HabitStatus.active
+        )
+    )
     
     # Total checkins
-    total_checkins = db.query(Checkin).filter(Checkin.user_id == current_user.id).count()
+    total_checkins = await db.scalar(
+        select(func.count(Checkin.id)).where(Checkin.user_id == current_user.id)
+    )
     
     # Current longest streak across all habits
-    current_longest_streak = get_longest_current_streak(db, current_user.id)
+    current_longest_streak = await get_longest_current_streak(db, current_user.id)
     
     # Monthly completion rate
-    monthly_rate = calculate_monthly_completion_rate(db, current_user.id)
+    monthly_rate = await calculate_monthly_completion_rate(db, current_user.id)
     
     # Weekly completion rate
-    weekly_rate = calculate_weekly_completion_rate(db, current_user.id)
+    weekly_rate = await calculate_weekly_completion_rate(db, current_user.id)
     
     return UserStatistics(
         total_habits=total_habits,
@@ -49,44 +101,26 @@ async def get_user_statistics(
     )
 
 
-@router.get("/habits", response_model=List[HabitStats])
-async def get_habit_statistics(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get statistics for all user habits"""
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.status == HabitStatus.active
-    ).all()
+async def compute_habit_statistics(db: AsyncSession, user_id: int) -> List[HabitStats]:
+    """Compute statistics for all user habits"""
+    today = date.today()
+    service = HabitStatsService(db)
+    habits = await service.get_active_habits_with_stats(user_id)
+    streaks = await service.get_current_streaks([row for _, row in habits], today)
     
     habit_stats = []
-    for habit in habits:
-        # Total checkins
-        total_checkins = db.query(Checkin).filter(Checkin.habit_id == habit.id).count()
-        
-        # Current streak
-        current_streak = calculate_habit_current_streak(db, habit.id)
-        
-        # Longest streak
-        longest_streak = calculate_habit_longest_streak(db, habit.id)
-        
+    for habit, row in habits:
         # Completion rate (last 30 days)
-        completion_rate = calculate_habit_completion_rate(db, habit.id, 30)
-        
-        # Last checkin date
-        last_checkin = db.query(Checkin).filter(
-            Checkin.habit_id == habit.id
-        ).order_by(desc(Checkin.checkin_date)).first()
+        recent_checkins = count_recent_checkins(row, today - timedelta(days=29), today)
         
         habit_stats.append(HabitStats(
             habit_id=habit.id,
             habit_name=habit.name,
-            total_checkins=total_checkins,
-            current_streak=current_streak,
-            longest_streak=longest_streak,
-            completion_rate=completion_rate,
-            last_checkin_date=last_checkin.checkin_date if last_checkin else None
+            total_checkins=row.total_checkins,
+            current_streak=streaks[habit.id],
+            longest_streak=row.longest_streak,
+            completion_rate=(recent_checkins / 30) * 100,
+            last_checkin_date=row.last_checkin_date
         ))
     
     return habit_stats
@@ -94,39 +128,42 @@ async def get_habit_statistics(
 
 @router.get("/daily")
 async def get_daily_statistics(
-    days: int = 30,
+    days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get daily statistics for the last N days"""
     end_date = date.today()
     start_date = end_date - timedelta(days=days-1)
     
     # Get active habits count
-    active_habits_count = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.status == HabitStatus.active
-    ).count()
+    active_habits_count = await db.scalar(
+        select(func.count(Habit.id)).where(
+            Habit.user_id == current_user.id,
+            Habit.status == HabitStatus.active
+        )
+    )
+    
+    rollup = await DailyStatsService(db).get_days(current_user.id, start_date, end_date)
     
     daily_stats = []
     current_date = start_date
     
     while current_date <= end_date:
-        # Get checkins for this date
-        daily_checkins = db.query(Checkin).filter(
-            and_(
-                Checkin.user_id == current_user.id,
-                Checkin.checkin_date == current_date
-            )
-        ).count()
+        # Get checkins for this date, with the active habits snapshot taken that day
+        day = rollup.get(current_date)
+        daily_checkins = day.checkins if day else 0
+        total_habits = active_habits_count
+        if day and day.active_habit_count is not None:
+            total_habits = day.active_habit_count
         
-        completion_rate = (daily_checkins / active_habits_count * 100) if active_habits_count > 0 else 0
+        completion_rate = (daily_checkins / total_habits * 100) if total_habits > 0 else 0
         
         daily_stats.append(DailyStats(
             date=current_date,
             total_checkins=daily_checkins,
             habits_completed=daily_checkins,
-            total_habits=active_habits_count,
+            total_habits=total_habits,
             completion_rate=completion_rate
         ))
         
@@ -139,7 +176,7 @@ async def get_daily_statistics(
 async def get_trend_data(
     period: str = "month",  # week, month, year
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get trend data for charts"""
     if period == "week":
@@ -155,23 +192,14 @@ async def get_trend_data(
     start_date = end_date - timedelta(days=days-1)
     
     # Get daily checkin counts
-    daily_data = db.query(
-        Checkin.checkin_date,
-        func.count(Checkin.id).label('count')
-    ).filter(
-        and_(
-            Checkin.user_id == current_user.id,
-            Checkin.checkin_date >= start_date,
-            Checkin.checkin_date <= end_date
-        )
-    ).group_by(Checkin.checkin_date).all()
+    rollup = await DailyStatsService(db).get_days(current_user.id, start_date, end_date)
     
     # Create labels and data arrays
     labels = []
     checkin_counts = []
     
     current_date = start_date
-    data_dict = {item.checkin_date: item.count for item in daily_data}
+    data_dict = {day: row.checkins for day, row in rollup.items()}
     
     while current_date <= end_date:
         labels.append(current_date.strftime("%m-%d"))
@@ -191,131 +219,53 @@ async def get_trend_data(
     )
 
 
-def calculate_habit_current_streak(db: Session, habit_id: int) -> int:
-    """Calculate current streak for a specific habit"""
-    today = date.today()
-    streak = 0
-    current_date = today
-    
-    while True:
-        checkin = db.query(Checkin).filter(
-            and_(
-                Checkin.habit_id == habit_id,
-                Checkin.checkin_date == current_date
-            )
-        ).first()
-        
-        if checkin:
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
-    
-    return streak
-
-
-def calculate_habit_longest_streak(db: Session, habit_id: int) -> int:
-    """Calculate longest streak for a specific habit"""
-    checkins = db.query(Checkin).filter(
-        Checkin.habit_id == habit_id
-    ).order_by(Checkin.checkin_date).all()
-    
-    if not checkins:
-        return 0
-    
-    longest_streak = 0
-    current_streak = 1
-    
-    for i in range(1, len(checkins)):
-        prev_date = checkins[i-1].checkin_date
-        curr_date = checkins[i].checkin_date
-        
-        if (curr_date - prev_date).days == 1:
-            current_streak += 1
-        else:
-            longest_streak = max(longest_streak, current_streak)
-            current_streak = 1
-    
-    return max(longest_streak, current_streak)
-
-
-def calculate_habit_completion_rate(db: Session, habit_id: int, days: int) -> float:
-    """Calculate completion rate for a habit over the last N days"""
-    end_date = date.today()
-    start_date = end_date - timedelta(days=days-1)
-    
-    checkin_count = db.query(Checkin).filter(
-        and_(
-            Checkin.habit_id == habit_id,
-            Checkin.checkin_date >= start_date,
-            Checkin.checkin_date <= end_date
-        )
-    ).count()
-    
-    return (checkin_count / days) * 100
-
-
-def get_longest_current_streak(db: Session, user_id: int) -> int:
+async def get_longest_current_streak(db: AsyncSession, user_id: int) -> int:
     """Get the longest current streak across all user habits"""
-    habits = db.query(Habit).filter(
-        Habit.user_id == user_id,
-        Habit.status == HabitStatus.active
-    ).all()
-    
-    longest_streak = 0
-    for habit in habits:
-        streak = calculate_habit_current_streak(db, habit.id)
-        longest_streak = max(longest_streak, streak)
-    
-    return longest_streak
+    today = date.today()
+    service = HabitStatsService(db)
+    habits = await service.get_active_habits_with_stats(user_id)
+    streaks = await service.get_current_streaks([row for _, row in habits], today)
+    return max(streaks.values(), default=0)
 
 
-def calculate_monthly_completion_rate(db: Session, user_id: int) -> float:
+async def calculate_monthly_completion_rate(db: AsyncSession, user_id: int) -> float:
     """Calculate completion rate for current month"""
     today = date.today()
     first_day = today.replace(day=1)
     
-    active_habits = db.query(Habit).filter(
-        Habit.user_id == user_id,
-        Habit.status == HabitStatus.active
-    ).count()
+    active_habits = await db.scalar(
+        select(func.count(Habit.id)).where(
+            Habit.user_id == user_id,
+            Habit.status == HabitStatus.active
+        )
+    )
     
     if active_habits == 0:
         return 0.0
     
     total_expected = active_habits * today.day
-    total_completed = db.query(Checkin).filter(
-        and_(
-            Checkin.user_id == user_id,
-            Checkin.checkin_date >= first_day,
-            Checkin.checkin_date <= today
-        )
-    ).count()
+    total_completed = await DailyStatsService(db).count_checkins(user_id, first_day, today)
     
     return (total_completed / total_expected) * 100 if total_expected > 0 else 0.0
 
 
-def calculate_weekly_completion_rate(db: Session, user_id: int) -> float:
+async def calculate_weekly_completion_rate(db: AsyncSession, user_id: int) -> float:
     """Calculate completion rate for current week"""
     today = date.today()
     week_start = today - timedelta(days=today.weekday())
     
-    active_habits = db.query(Habit).filter(
-        Habit.user_id == user_id,
-        Habit.status == HabitStatus.active
-    ).count()
+    active_habits = await db.scalar(
+        select(func.count(Habit.id)).where(
+            Habit.user_id == user_id,
+            Habit.status == HabitStatus.active
+        )
+    )
     
     if active_habits == 0:
         return 0.0
     
     days_in_week = (today - week_start).days + 1
     total_expected = active_habits * days_in_week
-    total_completed = db.query(Checkin).filter(
-        and_(
-            Checkin.user_id == user_id,
-            Checkin.checkin_date >= week_start,
-            Checkin.checkin_date <= today
-        )
-    ).count()
+    total_completed = await DailyStatsService(db).count_checkins(user_id, week_start, today)
     
     return (total_completed / total_expected) * 100 if total_expected > 0 else 0.0
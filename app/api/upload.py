@@ -21,6 +21,8 @@ async def upload_image(
             "file_path": file_path,
             "filename": file.filename
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
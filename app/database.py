@@ -1,10 +1,39 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import redis
+from redis import asyncio as aioredis
 from app.config import settings
 
-# Database setup
+# Async drivers used for each sync database backend
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url() -> str:
+    """Get the async database URL, deriving it from database_url if needed"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    
+    url = make_url(settings.database_url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+def _pool_options(url: str) -> dict:
+    """Connection pool options (SQLite uses its own pool implementation)"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_recycle": 300,
+    }
+
+
+# Database setup (sync engine, used for schema management and scripts)
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
@@ -15,17 +44,37 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-# Redis setup
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+# Async database setup (used by request handlers)
+async_database_url = get_async_database_url()
+async_engine = create_async_engine(
+    async_database_url,
+    pool_pre_ping=True,
+    echo=settings.debug,
+    **_pool_options(async_database_url)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Redis setup (short timeouts so callers can fall back to the database)
+redis_options = {
+    "socket_connect_timeout": settings.redis_socket_timeout,
+    "socket_timeout": settings.redis_socket_timeout,
+}
+redis_client = aioredis.from_url(settings.redis_url, decode_responses=True, **redis_options)
+
+# Binary-safe client for bitmap values
+redis_bytes_client = aioredis.from_url(settings.redis_url, **redis_options)
 
 
-def get_db():
+async def get_db():
     """Database dependency for FastAPI"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def get_redis():
@@ -1,24 +1,24 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 from app.config import settings
-from app.database import engine, Base
-from app.api import auth, habits, checkins, statistics, points, upload
+from app.api import auth, habits, checkins, statistics, points, upload, export, images
+from app.utils.file_upload import image_processor
 from app.utils.logging import setup_logging
+from app.utils.middleware import UploadSizeLimitMiddleware
+from app.utils.wechat import wechat_client
 
 # Setup logging
 setup_logging()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Habit Tracker API",
     description="Backend API for WeChat Mini-Program Habit Tracker",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -30,6 +30,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Turn away oversized uploads before their body is read
+app.add_middleware(UploadSizeLimitMiddleware, max_size=settings.max_file_size)
+
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(habits.router, prefix="/api")
@@ -37,6 +40,22 @@ app.include_router(checkins.router, prefix="/api")
 app.include_router(statistics.router, prefix="/api")
 app.include_router(points.router, prefix="/api")
 app.include_router(upload.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+
+# Image variants, reached through nginx when no cached file exists yet
+app.include_router(images.router)
+
+
+@app.on_event("shutdown")
+async def shutdown_image_workers():
+    """Stop the image compression worker processes"""
+    image_processor.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_wechat_client():
+    """Close pooled connections to the WeChat API"""
+    await wechat_client.aclose()
 
 
 @app.get("/")
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, Index, func, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.utils.storage import file_name_default
 
 
 class Checkin(Base):
@@ -13,10 +14,16 @@ class Checkin(Base):
     checkin_time = Column(DateTime, default=func.now())
     note = Column(Text)
     image = Column(String(200))
+    image_name = Column(String(100), default=file_name_default("image"))  # File name of image, for upload GC
     is_makeup = Column(Boolean, default=False)
     
     # Unique constraint to prevent duplicate checkins for same habit on same date
-    __table_args__ = (UniqueConstraint('habit_id', 'checkin_date', name='unique_habit_date_checkin'),)
+    __table_args__ = (
+        UniqueConstraint('habit_id', 'checkin_date', name='unique_habit_date_checkin'),
+        Index('ix_checkins_user_id_checkin_date', 'user_id', 'checkin_date'),
+        Index('ix_checkins_image', 'image'),
+        Index('ix_checkins_image_name', 'image_name'),
+    )
     
     # Relationships
     habit = relationship("Habit", back_populates="checkins")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Time, Enum, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, Time, Enum, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -30,6 +30,8 @@ class Habit(Base):
     status = Column(Enum(HabitStatus), default=HabitStatus.active)
     created_at = Column(DateTime, default=func.now())
     
+    __table_args__ = (Index('ix_habits_user_id_status', 'user_id', 'status'),)
+    
     # Relationships
     user = relationship("User", back_populates="habits")
     checkins = relationship("Checkin", back_populates="habit", cascade="all, delete-orphan")
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, DateTime, ForeignKey, func
+from app.database import Base
+
+
+class HabitStat(Base):
+    __tablename__ = "habit_stats"
+    
+    habit_id = Column(Integer, ForeignKey("habits.id"), primary_key=True)
+    total_checkins = Column(Integer, nullable=False, default=0)
+    last_checkin_date = Column(Date)
+    last_streak = Column(Integer, nullable=False, default=0)  # Streak ending at last_checkin_date
+    longest_streak = Column(Integer, nullable=False, default=0)
+    recent_days = Column(BigInteger, nullable=False, default=0)  # Bit N: checked in N days before last_checkin_date
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -19,5 +19,10 @@ class PointRecord(Base):
     reason = Column(String(100))
     created_at = Column(DateTime, default=func.now())
     
+    __table_args__ = (
+        Index('ix_point_records_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_point_records_user_id_type_created_at', 'user_id', 'type', 'created_at'),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="point_records")
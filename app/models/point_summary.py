@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, func
+from app.database import Base
+
+
+class UserPointSummary(Base):
+    __tablename__ = "user_point_summaries"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_earned_date = Column(Date, nullable=False)  # Periods below are relative to this day
+    earned_today = Column(Integer, nullable=False, default=0)
+    earned_this_week = Column(Integer, nullable=False, default=0)
+    earned_this_month = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from app.database import Base
+
+
+class StoredImage(Base):
+    __tablename__ = "stored_images"
+    
+    hash = Column(String(64), primary_key=True)  # SHA-256 of the uploaded bytes, also the file name
+    path = Column(String(200), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # Check-ins whose image is this file
+    created_at = Column(DateTime, default=func.now())
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.utils.storage import file_name_default
 
 
 class User(Base):
@@ -9,7 +10,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     openid = Column(String(100), unique=True, nullable=False, index=True)
     nickname = Column(String(50))
-    avatar = Column(String(200))
+    avatar = Column(String(200), index=True)
+    avatar_name = Column(String(100), default=file_name_default("avatar"), index=True)  # File name of avatar, for upload GC
     points = Column(Integer, default=0)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
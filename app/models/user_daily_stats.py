@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from app.database import Base
+
+
+class UserDailyStat(Base):
+    __tablename__ = "user_daily_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    checkins = Column(Integer, nullable=False, default=0)
+    active_habit_count = Column(Integer)  # Snapshot at the last check-in of the day
+    points_earned = Column(Integer, nullable=False, default=0)
@@ -1,7 +1,14 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime, date
 
+# Most check-ins one batch request may create
+MAX_BATCH_CHECKINS = 50
+
+# Widest range and most habits one calendar request may cover
+MAX_CALENDAR_DAYS = 366
+MAX_CALENDAR_HABITS = 50
+
 
 class CheckinBase(BaseModel):
     checkin_date: date
@@ -29,6 +36,41 @@ class CheckinResponse(CheckinBase):
         from_attributes = True
 
 
+class CheckinPage(BaseModel):
+    items: List[CheckinResponse]
+    next_cursor: Optional[str] = None  # Pass back as cursor to get the next page
+
+
+class CheckinBatchCreate(BaseModel):
+    items: List[CheckinCreate] = Field(..., min_length=1, max_length=MAX_BATCH_CHECKINS)
+
+
+class CheckinBatchResult(BaseModel):
+    habit_id: int
+    checkin_date: date
+    checkin: Optional[CheckinResponse] = None  # Set when the check-in was created
+    error: Optional[str] = None  # Why it was not, same message as POST /checkins
+
+
+class CheckinBatchResponse(BaseModel):
+    items: List[CheckinBatchResult]  # In request order
+    points_earned: int
+
+
+class HabitCalendar(BaseModel):
+    habit_id: int
+    # Base64 bitmasks over the requested days, most significant bit of the first byte is start_date
+    checked: str
+    makeup: str
+
+
+class CalendarRange(BaseModel):
+    start_date: date
+    end_date: date
+    days: int
+    habits: List[HabitCalendar]
+
+
 class MakeupCheckinRequest(BaseModel):
     habit_id: int
     checkin_date: date
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from app.models.point_record import PointType
 
@@ -16,6 +16,11 @@ class PointRecordResponse(BaseModel):
         from_attributes = True
 
 
+class PointRecordPage(BaseModel):
+    items: List[PointRecordResponse]
+    next_cursor: Optional[str] = None  # Pass back as cursor to get the next page
+
+
 class PointSummary(BaseModel):
     total_points: int
     earned_today: int
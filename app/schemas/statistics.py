@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import date
 
 
@@ -18,7 +18,7 @@ class HabitStats(BaseModel):
     current_streak: int
     longest_streak: int
     completion_rate: float
-    last_checkin_date: date = None
+    last_checkin_date: Optional[date] = None
 
 
 class UserStatistics(BaseModel):
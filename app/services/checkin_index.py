@@ -0,0 +1,190 @@
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date
+from app.database import redis_bytes_client
+from app.models.habit import Habit
+from app.models.checkin import Checkin
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# A bitmap value starts with its origin (date.toordinal(), 4 bytes big endian),
+# bit 32 + N is set when the habit was checked in N days after the origin
+HEADER_BYTES = 4
+
+# Sets the bit of a day in an existing bitmap. A day before the origin cannot be
+# stored, the bitmap is dropped so the next read rebuilds it from an earlier origin
+MARK_SCRIPT = """
+local head = redis.call('GETRANGE', KEYS[1], 0, 3)
+if #head < 4 then
+    return -1
+end
+local b1, b2, b3, b4 = string.byte(head, 1, 4)
+local offset = tonumber(ARGV[1]) - (((b1 * 256 + b2) * 256 + b3) * 256 + b4)
+if offset < 0 then
+    redis.call('DEL', KEYS[1])
+    return -2
+end
+return redis.call('SETBIT', KEYS[1], 32 + offset, 1)
+"""
+
+# Returns {origin, days set in the whole bitmap, bytes covering the requested days},
+# nil when the habit is not indexed
+READ_SCRIPT = """
+local head = redis.call('GETRANGE', KEYS[1], 0, 3)
+if #head < 4 then
+    return false
+end
+local b1, b2, b3, b4 = string.byte(head, 1, 4)
+local origin = ((b1 * 256 + b2) * 256 + b3) * 256 + b4
+local first = math.max(tonumber(ARGV[1]) - origin, 0)
+local last = tonumber(ARGV[2]) - origin
+local bits = ''
+if last >= first then
+    bits = redis.call('GETRANGE', KEYS[1], 4 + math.floor(first / 8), 4 + math.floor(last / 8))
+end
+return {origin, redis.call('BITCOUNT', KEYS[1], 4, -1), bits}
+"""
+
+
+def encode_bitmap(origin: date, dates: Iterable[date]) -> bytes:
+    """Bitmap value of the given check-in days, none of them before origin"""
+    bitmap = bytearray()
+    for checkin_date in dates:
+        offset = (checkin_date - origin).days
+        if offset // 8 >= len(bitmap):
+            bitmap.extend(bytes(offset // 8 - len(bitmap) + 1))
+        bitmap[offset // 8] |= 0x80 >> (offset % 8)
+    return origin.toordinal().to_bytes(HEADER_BYTES, "big") + bytes(bitmap)
+
+
+def count_days(bits: bytes, start: int, end: int) -> int:
+    """Days set for offsets start..end, in bitmap bytes beginning with the one holding start"""
+    size = len(bits) * 8
+    first = start % 8
+    last = min(end - start // 8 * 8, size - 1)
+    if last < first:
+        return 0
+    return (int.from_bytes(bits, "big") >> (size - 1 - last) & ((1 << (last - first + 1)) - 1)).bit_count()
+
+
+class CheckinIndexService:
+    """Mirror of each habit's check-in days as a Redis bitmap.
+    
+    Bits are set after the check-in commits, so a lost write is possible; reads
+    compare the bitmap's day count with habit_stats.total_checkins (kept in the
+    check-in transaction) and fall back to SQL, rebuilding the bitmap, when they
+    differ or the bitmap is missing. ``python manage.py rebuild-checkin-index``
+    backfills every habit.
+    """
+    
+    def __init__(self, redis=redis_bytes_client):
+        self.redis = redis
+        self._mark_script = redis.register_script(MARK_SCRIPT)
+        self._read_script = redis.register_script(READ_SCRIPT)
+    
+    @staticmethod
+    def key(habit_id: int) -> str:
+        return f"checkins:bitmap:{habit_id}"
+    
+    async def init_habit(self, habit: Habit):
+        """Start an empty bitmap for a newly created habit"""
+        try:
+            await self.redis.set(self.key(habit.id), encode_bitmap(habit.created_at.date(), []), nx=True)
+        except RedisError as e:
+            logger.warning(f"Failed to init check-in bitmap for habit {habit.id}: {e}")
+    
+    async def mark(self, checkins: Iterable[Tuple[int, date]]):
+        """Record committed check-ins, given as (habit id, date), in their habits' bitmaps"""
+        checkins = list(checkins)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for habit_id, checkin_date in checkins:
+                    await self._mark_script(
+                        keys=[self.key(habit_id)],
+                        args=[checkin_date.toordinal()],
+                        client=pipe
+                    )
+                await pipe.execute()
+        except RedisError as e:
+            # Reads notice the missing days and rebuild the bitmaps
+            logger.warning(f"Failed to update check-in bitmaps for {len(checkins)} check-ins: {e}")
+    
+    async def count_checkins(
+        self,
+        db: AsyncSession,
+        habit: Habit,
+        start_date: date,
+        end_date: date,
+        total_checkins: Optional[int]
+    ) -> Optional[int]:
+        """Count a habit's check-in days in a range from its bitmap, None when SQL has to answer.
+        
+        total_checkins is the habit's habit_stats count, read in the caller's transaction.
+        """
+        if total_checkins is None or end_date < start_date:
+            return None
+        
+        try:
+            found = await self._read_script(
+                keys=[self.key(habit.id)],
+                args=[start_date.toordinal(), end_date.toordinal()],
+                client=self.redis
+            )
+        except RedisError as e:
+            logger.warning(f"Check-in bitmap index unavailable: {e}")
+            return None
+        
+        if found is None or int(found[1]) != total_checkins:
+            # Missing, or a day was lost or not yet written: repair from the checkins table
+            await self.rebuild_habits(db, [habit])
+            return None
+        
+        origin = int(found[0])
+        start = max(start_date.toordinal() - origin, 0)
+        return count_days(found[2], start, end_date.toordinal() - origin)
+    
+    async def rebuild_habits(self, db: AsyncSession, habits: List[Habit]):
+        """Write the bitmaps of habits from the checkins table"""
+        if not habits:
+            return
+        
+        dates: Dict[int, List[date]] = {habit.id: [] for habit in habits}
+        for habit_id, checkin_date in await db.execute(
+            select(Checkin.habit_id, Checkin.checkin_date).where(Checkin.habit_id.in_(dates))
+        ):
+            dates[habit_id].append(checkin_date)
+        
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for habit in habits:
+                    # Origin at the habit's creation, or its earliest check-in if that is older
+                    origin = min([habit.created_at.date(), *dates[habit.id]])
+                    pipe.set(self.key(habit.id), encode_bitmap(origin, dates[habit.id]))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to rebuild check-in bitmaps of {len(habits)} habits: {e}")
+    
+    async def rebuild(self, db: AsyncSession, batch_size: int = 500) -> int:
+        """Rebuild the bitmaps of all habits from the checkins table, returns habits indexed"""
+        indexed = 0
+        last_id = 0
+        
+        while True:
+            habits = (await db.scalars(
+                select(Habit).where(Habit.id > last_id).order_by(Habit.id).limit(batch_size)
+            )).all()
+            if not habits:
+                break
+            
+            await self.rebuild_habits(db, habits)
+            indexed += len(habits)
+            last_id = habits[-1].id
+            db.expunge_all()
+        
+        return indexed
+
+
+checkin_index = CheckinIndexService()
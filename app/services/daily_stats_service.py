@@ -0,0 +1,125 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, func, select
+from typing import Dict, Optional
+from datetime import date
+from app.models.user import User
+from app.models.habit import Habit, HabitStatus
+from app.models.checkin import Checkin
+from app.models.point_record import PointRecord, PointType
+from app.models.user_daily_stats import UserDailyStat
+from app.utils.sql import upsert
+
+
+class DailyStatsService:
+    """Maintains the per-user daily rollup in user_daily_stats"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.table = UserDailyStat.__table__
+    
+    def _upsert(self, rows, set_):
+        return upsert(self.db.bind.dialect.name, self.table, rows, ["user_id", "date"], set_)
+    
+    async def record_checkin(self, user_id: int, checkin_date: date, active_habit_count: Optional[int] = None) -> int:
+        """Count a check-in in the rollup without committing, returns the active habit count"""
+        if active_habit_count is None:
+            active_habit_count = await self.count_active_habits(user_id)
+        
+        await self.db.execute(self._upsert(
+            {
+                "user_id": user_id,
+                "date": checkin_date,
+                "checkins": 1,
+                "active_habit_count": active_habit_count,
+                "points_earned": 0
+            },
+            lambda proposed: {
+                "checkins": self.table.c.checkins + 1,
+                "active_habit_count": proposed.active_habit_count
+            }
+        ))
+        return active_habit_count
+    
+    async def count_active_habits(self, user_id: int) -> int:
+        """Number of active habits of a user"""
+        return await self.db.scalar(
+            select(func.count(Habit.id)).where(
+                Habit.user_id == user_id,
+                Habit.status == HabitStatus.active
+            )
+        )
+    
+    async def record_points(self, user_id: int, points: int, earned_date: date):
+        """Count earned points in the rollup, without committing"""
+        await self.db.execute(self._upsert(
+            {
+                "user_id": user_id,
+                "date": earned_date,
+                "checkins": 0,
+                "points_earned": points
+            },
+            lambda proposed: {
+                "points_earned": self.table.c.points_earned + points
+            }
+        ))
+    
+    async def get_days(self, user_id: int, start_date: date, end_date: date) -> Dict[date, UserDailyStat]:
+        """Get the rollup rows of a user in a date range"""
+        rows = await self.db.scalars(
+            select(UserDailyStat).where(
+                UserDailyStat.user_id == user_id,
+                UserDailyStat.date >= start_date,
+                UserDailyStat.date <= end_date
+            )
+        )
+        return {row.date: row for row in rows}
+    
+    async def count_checkins(self, user_id: int, start_date: date, end_date: date) -> int:
+        """Total check-ins of a user in a date range"""
+        total = await self.db.scalar(
+            select(func.sum(UserDailyStat.checkins)).where(
+                UserDailyStat.user_id == user_id,
+                UserDailyStat.date >= start_date,
+                UserDailyStat.date <= end_date
+            )
+        )
+        return int(total or 0)
+    
+    async def backfill(self, batch_size: int = 200) -> int:
+        """Rebuild check-in and point totals from checkins and point_records, returns rows written"""
+        written = 0
+        last_user_id = 0
+        earned_date = func.date(PointRecord.created_at, type_=Date)
+        
+        while True:
+            user_ids = (await self.db.scalars(
+                select(User.id).where(User.id > last_user_id).order_by(User.id).limit(batch_size)
+            )).all()
+            if not user_ids:
+                break
+            
+            sources = {
+                "checkins": select(Checkin.user_id, Checkin.checkin_date, func.count(Checkin.id))
+                    .where(Checkin.user_id.in_(user_ids))
+                    .group_by(Checkin.user_id, Checkin.checkin_date),
+                "points_earned": select(PointRecord.user_id, earned_date, func.sum(PointRecord.points))
+                    .where(PointRecord.user_id.in_(user_ids), PointRecord.type == PointType.earn)
+                    .group_by(PointRecord.user_id, earned_date),
+            }
+            
+            for column, query in sources.items():
+                rows = [
+                    {"user_id": user_id, "date": day, "checkins": 0, "points_earned": 0, column: int(total)}
+                    for user_id, day, total in await self.db.execute(query)
+                ]
+                if rows:
+                    await self.db.execute(self._upsert(
+                        rows,
+                        lambda proposed: {column: proposed[column]}
+                    ))
+                    written += len(rows)
+            
+            await self.db.commit()
+            last_user_id = user_ids[-1]
+        
+        return written
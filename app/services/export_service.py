@@ -0,0 +1,109 @@
+import csv
+import enum
+import io
+import json
+from sqlalchemy import select
+from typing import AsyncIterator, Dict, List
+from datetime import date, datetime, time
+from app.database import AsyncSessionLocal
+from app.models.habit import Habit
+from app.models.checkin import Checkin
+from app.models.point_record import PointRecord
+
+# Rows fetched from the server-side cursor per batch
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ExportDataset(str, enum.Enum):
+    all = "all"
+    habits = "habits"
+    checkins = "checkins"
+    points = "points"
+
+
+# Exported columns of each dataset, in output order
+DATASET_COLUMNS = {
+    ExportDataset.habits: [
+        Habit.id, Habit.name, Habit.description, Habit.icon, Habit.category,
+        Habit.frequency, Habit.reminder_time, Habit.status, Habit.created_at
+    ],
+    ExportDataset.checkins: [
+        Checkin.id, Checkin.habit_id, Checkin.checkin_date, Checkin.checkin_time,
+        Checkin.note, Checkin.image, Checkin.is_makeup
+    ],
+    ExportDataset.points: [
+        PointRecord.id, PointRecord.points, PointRecord.type,
+        PointRecord.reason, PointRecord.created_at
+    ],
+}
+
+
+def _plain(value):
+    """JSON/CSV friendly form of a column value"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+class ExportService:
+    """Streams a user's history with server-side cursors, one batch in memory at a time"""
+    
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+    
+    def _query(self, dataset: ExportDataset):
+        if dataset == ExportDataset.habits:
+            owner, order = Habit.user_id, [Habit.id]
+        elif dataset == ExportDataset.checkins:
+            # Ordered like the (user_id, checkin_date) index so no sort is needed
+            owner, order = Checkin.user_id, [Checkin.checkin_date, Checkin.id]
+        else:
+            owner, order = PointRecord.user_id, [PointRecord.created_at, PointRecord.id]
+        
+        return (
+            select(*DATASET_COLUMNS[dataset])
+            .where(owner == self.user_id)
+            .order_by(*order)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+    
+    async def _batches(self, dataset: ExportDataset) -> AsyncIterator[List[Dict]]:
+        names = [column.key for column in DATASET_COLUMNS[dataset]]
+        # A dedicated session, the request's one may be closed while streaming
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(self._query(dataset))
+            async for rows in result.partitions():
+                yield [dict(zip(names, map(_plain, row))) for row in rows]
+    
+    async def stream_ndjson(self, dataset: ExportDataset) -> AsyncIterator[str]:
+        """One JSON object per line, tagged with its dataset"""
+        datasets = list(DATASET_COLUMNS) if dataset == ExportDataset.all else [dataset]
+        for name in datasets:
+            async for batch in self._batches(name):
+                yield "".join(
+                    json.dumps({"type": name.value, **record}, ensure_ascii=False) + "\n"
+                    for record in batch
+                )
+    
+    async def stream_csv(self, dataset: ExportDataset) -> AsyncIterator[str]:
+        """CSV with a header row, for a single dataset"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.key for column in DATASET_COLUMNS[dataset]])
+        
+        async for batch in self._batches(dataset):
+            for record in batch:
+                writer.writerow(record.values())
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        if buffer.tell():
+            yield buffer.getvalue()
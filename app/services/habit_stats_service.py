@@ -0,0 +1,177 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, timedelta
+from app.models.habit import Habit, HabitStatus
+from app.models.checkin import Checkin
+from app.models.habit_stats import HabitStat
+from app.services.streak_service import StreakService
+from app.utils.sql import upsert
+
+# Days of check-in history kept in HabitStat.recent_days (fits a signed BIGINT)
+RECENT_DAYS = 62
+RECENT_MASK = (1 << RECENT_DAYS) - 1
+
+
+def get_current_streak(stats: HabitStat, today: date) -> Optional[int]:
+    """Consecutive check-in days ending today, None when the recent days window cannot tell"""
+    if stats.last_checkin_date is None or stats.last_checkin_date < today:
+        return 0
+    if stats.last_checkin_date == today:
+        return stats.last_streak
+    
+    # Check-ins dated in the future
+    days_ahead = (stats.last_checkin_date - today).days
+    if stats.last_streak > days_ahead:
+        return stats.last_streak - days_ahead
+    
+    # Today is in an earlier streak, walk the recent days back from today
+    bits = stats.recent_days >> days_ahead
+    streak = ((bits ^ (bits + 1)).bit_length()) - 1
+    if streak >= RECENT_DAYS - days_ahead:
+        # The streak reaches the oldest day kept and may go back further
+        return None
+    return streak
+
+
+def count_recent_checkins(stats: HabitStat, start_date: date, end_date: Optional[date] = None) -> int:
+    """Check-in days in the given (inclusive) range, within the recent days window"""
+    last = stats.last_checkin_date
+    if last is None:
+        return 0
+    
+    newest = max((last - end_date).days, 0) if end_date else 0
+    oldest = min((last - start_date).days, RECENT_DAYS - 1)
+    if oldest < newest:
+        return 0
+    return (stats.recent_days >> newest & ((1 << (oldest - newest + 1)) - 1)).bit_count()
+
+
+class HabitStatsService:
+    """Maintains the habit_stats row of each habit alongside its check-ins"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def record_checkin(self, habit_id: int, checkin_date: date) -> HabitStat:
+        """Update a habit's stats for a new (already flushed) check-in, without committing"""
+        # Write pending updates of earlier check-ins in this transaction first, and read the
+        # row back over the session's copy, so an update and a recompute never overwrite each other
+        await self.db.flush()
+        stats = await self.db.get(HabitStat, habit_id, with_for_update=True, populate_existing=True)
+        last = stats.last_checkin_date if stats else None
+        
+        if stats is None or (last is not None and checkin_date <= last):
+            # Missing row or a check-in inserted before the latest one: recompute
+            await self.recompute([habit_id])
+            return await self.db.get(HabitStat, habit_id, populate_existing=True)
+        
+        gap = (checkin_date - last).days if last else RECENT_DAYS
+        stats.total_checkins += 1
+        stats.last_streak = stats.last_streak + 1 if gap == 1 else 1
+        stats.longest_streak = max(stats.longest_streak, stats.last_streak)
+        stats.recent_days = ((stats.recent_days << gap) | 1) & RECENT_MASK
+        stats.last_checkin_date = checkin_date
+        return stats
+    
+    async def get_current_streaks(self, rows: Iterable[HabitStat], today: date) -> Dict[int, int]:
+        """Current streak of each habit from its stats row, or from the checkins table when the row cannot tell"""
+        streaks = {stats.habit_id: get_current_streak(stats, today) for stats in rows}
+        unknown = [habit_id for habit_id, streak in streaks.items() if streak is None]
+        if unknown:
+            streaks.update(await StreakService(self.db).get_current_streaks(unknown, today))
+        return streaks
+    
+    async def get_current_streak(self, stats: HabitStat, today: date) -> int:
+        """Current streak of one habit, see get_current_streaks"""
+        return (await self.get_current_streaks([stats], today))[stats.habit_id]
+    
+    async def get_active_habits_with_stats(self, user_id: int) -> List[Tuple[Habit, HabitStat]]:
+        """Get a user's active habits with their stats rows, repairing any that are missing"""
+        rows = (await self.db.execute(
+            select(Habit, HabitStat)
+            .outerjoin(HabitStat, HabitStat.habit_id == Habit.id)
+            .where(
+                Habit.user_id == user_id,
+                Habit.status == HabitStatus.active
+            )
+            .order_by(Habit.id)
+        )).all()
+        
+        missing = [habit.id for habit, stats in rows if stats is None]
+        if missing:
+            repaired = await self.recompute(missing)
+            await self.db.commit()
+            rows = [(habit, stats or repaired[habit.id]) for habit, stats in rows]
+        
+        return rows
+    
+    async def recompute(self, habit_ids: Iterable[int]) -> Dict[int, HabitStat]:
+        """Rebuild stats rows from the checkins table, without committing"""
+        habit_ids = list(habit_ids)
+        if not habit_ids:
+            return {}
+        
+        summaries = await StreakService(self.db).get_summaries(habit_ids)
+        
+        # Recent check-in days relative to each habit's last check-in
+        recent_days = {habit_id: 0 for habit_id in habit_ids}
+        last_dates = [s.last_checkin_date for s in summaries.values() if s.last_checkin_date]
+        if last_dates:
+            checkins = await self.db.execute(
+                select(Checkin.habit_id, Checkin.checkin_date).where(
+                    Checkin.habit_id.in_(habit_ids),
+                    Checkin.checkin_date > min(last_dates) - timedelta(days=RECENT_DAYS),
+                    Checkin.checkin_date <= max(last_dates)
+                )
+            )
+            for habit_id, checkin_date in checkins:
+                days_before = (summaries[habit_id].last_checkin_date - checkin_date).days
+                if 0 <= days_before < RECENT_DAYS:
+                    recent_days[habit_id] |= 1 << days_before
+        
+        rows = [
+            {
+                "habit_id": habit_id,
+                "total_checkins": summary.total_checkins,
+                "last_checkin_date": summary.last_checkin_date,
+                "last_streak": summary.last_streak,
+                "longest_streak": summary.longest_streak,
+                "recent_days": recent_days[habit_id]
+            }
+            for habit_id, summary in summaries.items()
+        ]
+        
+        await self.db.execute(
+            upsert(
+                self.db.bind.dialect.name,
+                HabitStat.__table__,
+                rows,
+                ["habit_id"],
+                lambda proposed: {
+                    column: proposed[column]
+                    for column in rows[0]
+                    if column != "habit_id"
+                }
+            )
+        )
+        return {row["habit_id"]: HabitStat(**row) for row in rows}
+    
+    async def recompute_all(self, batch_size: int = 500) -> int:
+        """Rebuild the stats of every habit in batches, returns habits processed"""
+        processed = 0
+        last_id = 0
+        
+        while True:
+            habit_ids = (await self.db.scalars(
+                select(Habit.id).where(Habit.id > last_id).order_by(Habit.id).limit(batch_size)
+            )).all()
+            if not habit_ids:
+                break
+            
+            await self.recompute(habit_ids)
+            await self.db.commit()
+            processed += len(habit_ids)
+            last_id = habit_ids[-1]
+        
+        return processed
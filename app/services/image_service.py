@@ -0,0 +1,58 @@
+import re
+from sqlalchemy import select, func, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.models.checkin import Checkin
+from app.models.stored_image import StoredImage
+from app.utils.sql import upsert
+
+# Paths or URLs handed out by FileUploadService for content-addressed images, sharded or flat
+STORED_IMAGE_PATH = re.compile(r"(?:^|/)images/(?:[0-9a-f]{2}/[0-9a-f]{2}/)?([0-9a-f]{64})\.(jpg|png|gif|webp)$")
+
+
+def stored_image_hash(path: Optional[str]) -> Optional[str]:
+    """Content hash of a stored image path, None for anything else"""
+    match = STORED_IMAGE_PATH.search(path or "")
+    return match.group(1) if match else None
+
+
+class ImageService:
+    """Reference counts of content-addressed images"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.table = StoredImage.__table__
+    
+    async def add_reference(self, path: Optional[str]):
+        """Count one more check-in using an image, without committing"""
+        image_hash = stored_image_hash(path)
+        if image_hash is None:
+            return
+        
+        await self.db.execute(upsert(
+            self.db.bind.dialect.name,
+            self.table,
+            {"hash": image_hash, "path": path, "ref_count": 1},
+            ["hash"],
+            lambda proposed: {"ref_count": self.table.c.ref_count + 1}
+        ))
+    
+    async def recount_all(self) -> int:
+        """Rebuild every reference count from checkins.image, returns images referenced"""
+        counts = (await self.db.execute(
+            select(Checkin.image, func.count(Checkin.id))
+            .where(Checkin.image.like("%images/%"))
+            .group_by(Checkin.image)
+        )).all()
+        
+        rows = [
+            {"hash": stored_image_hash(path), "path": path, "ref_count": count}
+            for path, count in counts
+            if stored_image_hash(path)
+        ]
+        
+        await self.db.execute(delete(StoredImage))
+        if rows:
+            await self.db.execute(self.table.insert(), rows)
+        await self.db.commit()
+        return len(rows)
@@ -1,42 +1,63 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select, update
+from typing import NamedTuple, Tuple
+from datetime import date, datetime, time, timedelta
 from app.models.user import User
-from app.models.checkin import Checkin
 from app.models.point_record import PointRecord, PointType
+from app.models.point_summary import UserPointSummary
+from app.services.daily_stats_service import DailyStatsService
+from app.services.user_cache import user_cache
+
+
+class EarnedPoints(NamedTuple):
+    today: int
+    this_week: int
+    this_month: int
+
+
+def period_starts(today: date) -> Tuple[date, date]:
+    """First day of the week (Monday) and of the month containing a day"""
+    return today - timedelta(days=today.weekday()), today.replace(day=1)
 
 
 class PointService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def add_points(self, user_id: int, points: int, reason: str):
-        """Add points to user account"""
-        # Update user points
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if user:
-            user.points += points
-            
-            # Create point record
-            point_record = PointRecord(
-                user_id=user_id,
-                points=points,
-                type=PointType.earn,
-                reason=reason
-            )
-            self.db.add(point_record)
-            self.db.commit()
-            
-            return user.points
-        return 0
-    
-    def spend_points(self, user_id: int, points: int, reason: str) -> bool:
-        """Spend points from user account"""
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user or user.points < points:
+    async def credit(self, user_id: int, points: int, reason: str) -> bool:
+        """Add points to a user's balance and ledger, without committing"""
+        # Atomic increment, so concurrent requests never lose an update
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(points=User.points + points)
+        )
+        if result.rowcount == 0:
             return False
         
-        user.points -= points
+        await self._record_earned(user_id, points, date.today())
+        
+        # Create point record
+        point_record = PointRecord(
+            user_id=user_id,
+            points=points,
+            type=PointType.earn,
+            reason=reason
+        )
+        self.db.add(point_record)
+        await DailyStatsService(self.db).record_points(user_id, points, date.today())
+        return True
+    
+    async def debit(self, user_id: int, points: int, reason: str) -> bool:
+        """Take points from a user's balance and ledger if it covers them, without committing"""
+        # The balance check and decrement happen in one statement
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == user_id, User.points >= points)
+            .values(points=User.points - points)
+        )
+        if result.rowcount == 0:
+            return False
         
         # Create point record
         point_record = PointRecord(
@@ -46,18 +67,104 @@ class PointService:
             reason=reason
         )
         self.db.add(point_record)
-        self.db.commit()
+        return True
+    
+    async def add_points(self, user_id: int, points: int, reason: str):
+        """Add points to user account"""
+        if not await self.credit(user_id, points, reason):
+            return 0
         
+        await self.db.commit()
+        await user_cache.invalidate(user_id)
+        return await self.db.scalar(select(User.points).where(User.id == user_id))
+    
+    async def spend_points(self, user_id: int, points: int, reason: str) -> bool:
+        """Spend points from user account"""
+        if not await self.debit(user_id, points, reason):
+            return False
+        
+        await self.db.commit()
+        await user_cache.invalidate(user_id)
         return True
     
-    def calculate_checkin_points(self, user_id: int, habit_id: int) -> int:
-        """Calculate points for a check-in"""
+    async def get_earned_points(self, user_id: int) -> EarnedPoints:
+        """Points earned today, this week and this month"""
+        today = date.today()
+        summary = await self.db.get(UserPointSummary, user_id)
+        if summary is None:
+            return await self._earned_from_ledger(user_id, today)
+        
+        # Periods that ended since the last credit count as empty
+        week_start, month_start = period_starts(today)
+        last = summary.last_earned_date
+        return EarnedPoints(
+            summary.earned_today if last == today else 0,
+            summary.earned_this_week if last >= week_start else 0,
+            summary.earned_this_month if last >= month_start else 0
+        )
+    
+    async def _record_earned(self, user_id: int, points: int, today: date):
+        """Add earned points to the user's period counters, without committing.
+        
+        Runs after the balance update, whose row lock serializes credits per user.
+        """
+        table = UserPointSummary.__table__
+        week_start, month_start = period_starts(today)
+        
+        def rollover(total, period_start):
+            return case((table.c.last_earned_date >= period_start, total + points), else_=points)
+        
+        # MySQL evaluates SET left to right, so last_earned_date goes last
+        result = await self.db.execute(
+            update(table)
+            .where(table.c.user_id == user_id)
+            .ordered_values(
+                (table.c.earned_today, rollover(table.c.earned_today, today)),
+                (table.c.earned_this_week, rollover(table.c.earned_this_week, week_start)),
+                (table.c.earned_this_month, rollover(table.c.earned_this_month, month_start)),
+                (table.c.last_earned_date, today)
+            )
+        )
+        
+        if result.rowcount == 0:
+            # First credit since the counters were added, seed them from the ledger
+            earned = await self._earned_from_ledger(user_id, today)
+            self.db.add(UserPointSummary(
+                user_id=user_id,
+                last_earned_date=today,
+                earned_today=earned.today + points,
+                earned_this_week=earned.this_week + points,
+                earned_this_month=earned.this_month + points
+            ))
+    
+    async def _earned_from_ledger(self, user_id: int, today: date) -> EarnedPoints:
+        """Sum earned points per period from point_records with one range query"""
+        week_start, month_start = period_starts(today)
+        
+        def since(day: date):
+            return PointRecord.created_at >= datetime.combine(day, time.min)
+        
+        def earned_since(day: date):
+            return func.coalesce(func.sum(case((since(day), PointRecord.points), else_=0)), 0)
+        
+        row = (await self.db.execute(
+            select(
+                earned_since(today),
+                earned_since(week_start),
+                earned_since(month_start)
+            ).where(
+                PointRecord.user_id == user_id,
+                PointRecord.type == PointType.earn,
+                since(min(week_start, month_start))
+            )
+        )).one()
+        return EarnedPoints(*(int(total) for total in row))
+    
+    async def calculate_checkin_points(self, user_id: int, streak: int, active_habits: int) -> int:
+        """Calculate points for a check-in from the habit's current streak"""
         base_points = 10  # Base points for daily check-in
         bonus_points = 0
         
-        # Calculate current streak
-        streak = self._get_current_streak(user_id, habit_id)
-        
         # Streak bonuses
         if streak > 0 and streak % 7 == 0:  # Weekly streak bonus
             bonus_points += 50
@@ -65,65 +172,38 @@ class PointService:
             bonus_points += 200
         
         # Check monthly completion rate bonus
-        monthly_bonus = self._check_monthly_completion_bonus(user_id)
+        monthly_bonus = await self._check_monthly_completion_bonus(user_id, active_habits)
         bonus_points += monthly_bonus
         
         return base_points + bonus_points
     
-    def _get_current_streak(self, user_id: int, habit_id: int) -> int:
-        """Get current streak for a habit"""
-        today = date.today()
-        streak = 0
-        current_date = today
-        
-        while True:
-            checkin = self.db.query(Checkin).filter(
-                Checkin.user_id == user_id,
-                Checkin.habit_id == habit_id,
-                Checkin.checkin_date == current_date
-            ).first()
-            
-            if checkin:
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-        
-        return streak
-    
-    def _check_monthly_completion_bonus(self, user_id: int) -> int:
+    async def _check_monthly_completion_bonus(self, user_id: int, active_habits: int) -> int:
         """Check if user deserves monthly completion bonus"""
         today = date.today()
         first_day_of_month = today.replace(day=1)
         
-        # Get all user's active habits
-        from app.models.habit import Habit, HabitStatus
-        habits = self.db.query(Habit).filter(
-            Habit.user_id == user_id,
-            Habit.status == HabitStatus.active
-        ).all()
-        
-        if not habits:
+        # Bonus is only awarded near the end of the month
+        if not active_habits or today.day < 28:
             return 0
         
         # Check completion rate for current month
-        total_expected = len(habits) * today.day
-        total_completed = self.db.query(Checkin).filter(
-            Checkin.user_id == user_id,
-            Checkin.checkin_date >= first_day_of_month,
-            Checkin.checkin_date <= today
-        ).count()
+        total_expected = active_habits * today.day
+        total_completed = await DailyStatsService(self.db).count_checkins(
+            user_id, first_day_of_month, today
+        )
         
         completion_rate = total_completed / total_expected if total_expected > 0 else 0
         
-        # Award bonus if 100% completion rate and it's end of month
-        if completion_rate >= 1.0 and today.day >= 28:  # Near end of month
+        # Award bonus if 100% completion rate
+        if completion_rate >= 1.0:
             # Check if bonus already awarded this month
-            existing_bonus = self.db.query(PointRecord).filter(
-                PointRecord.user_id == user_id,
-                PointRecord.reason == "monthly_completion_bonus",
-                func.date(PointRecord.created_at) >= first_day_of_month
-            ).first()
+            existing_bonus = await self.db.scalar(
+                select(PointRecord.id).where(
+                    PointRecord.user_id == user_id,
+                    PointRecord.reason == "monthly_completion_bonus",
+                    PointRecord.created_at >= datetime.combine(first_day_of_month, time.min)
+                ).limit(1)
+            )
             
             if not existing_bonus:
                 return 300
@@ -0,0 +1,125 @@
+import asyncio
+from redis.exceptions import RedisError
+from pydantic import TypeAdapter
+from typing import Any, Awaitable, Callable, Dict, Optional
+from datetime import date
+from app.config import settings
+from app.database import redis_client
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Hash holding hit/miss counters, one field per "<name>:<outcome>"
+COUNTERS_KEY = "stats:cache:counters"
+
+# How long a waiting request polls for another request's recompute
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+
+
+class StatsCacheService:
+    """Read-through Redis cache for per-user statistics responses.
+    
+    Entries are keyed by a per-user version counter, so write paths only need
+    to call ``invalidate`` after committing; stale entries are never read again
+    and expire on their own. Any Redis failure falls back to computing directly.
+    """
+    
+    def __init__(self, redis=redis_client, ttl: int = settings.stats_cache_ttl):
+        self.redis = redis
+        self.ttl = ttl
+    
+    @staticmethod
+    def version_key(user_id: int) -> str:
+        return f"stats:version:{user_id}"
+    
+    @staticmethod
+    def entry_key(name: str, user_id: int, version: int, today: date) -> str:
+        # Streaks and rates depend on the current day as well as the data
+        return f"stats:{name}:{user_id}:{version}:{today.isoformat()}"
+    
+    async def invalidate(self, user_id: int):
+        """Drop cached statistics and the user snapshot, call after committing a write"""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.incr(self.version_key(user_id))
+                # Entries live much shorter than this, so a reset counter is harmless
+                pipe.expire(self.version_key(user_id), 30 * 24 * 3600)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to invalidate statistics cache for user {user_id}: {e}")
+    
+    async def get_or_compute(
+        self,
+        name: str,
+        user_id: int,
+        adapter: TypeAdapter,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Get a cached value, computing and storing it on a miss"""
+        try:
+            version = int(await self.redis.get(self.version_key(user_id)) or 0)
+            key = self.entry_key(name, user_id, version, date.today())
+            cached = await self.redis.get(key)
+        except RedisError as e:
+            logger.warning(f"Statistics cache unavailable: {e}")
+            return await compute()
+        
+        if cached is not None:
+            await self._count(name, "hit")
+            return adapter.validate_json(cached)
+        
+        await self._count(name, "miss")
+        
+        # Only one request recomputes a key, the others wait for its result
+        lock_key = f"{key}:lock"
+        try:
+            acquired = await self.redis.set(lock_key, 1, nx=True, ex=int(LOCK_WAIT_SECONDS) + 1)
+        except RedisError:
+            acquired = True
+        
+        if not acquired:
+            cached = await self._wait_for(key)
+            if cached is not None:
+                return adapter.validate_json(cached)
+        
+        try:
+            value = await compute()
+            await self.redis.set(key, adapter.dump_json(value), ex=self.ttl)
+        except RedisError as e:
+            logger.warning(f"Failed to store statistics cache entry: {e}")
+        finally:
+            if acquired:
+                await self._release(lock_key)
+        return value
+    
+    async def get_counters(self) -> Dict[str, int]:
+        """Hit/miss counters per cached endpoint"""
+        counters = await self.redis.hgetall(COUNTERS_KEY)
+        return {field: int(value) for field, value in counters.items()}
+    
+    async def _wait_for(self, key: str) -> Optional[str]:
+        for _ in range(int(LOCK_WAIT_SECONDS / LOCK_POLL_SECONDS)):
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            try:
+                cached = await self.redis.get(key)
+            except RedisError:
+                return None
+            if cached is not None:
+                return cached
+        return None
+    
+    async def _release(self, lock_key: str):
+        try:
+            await self.redis.delete(lock_key)
+        except RedisError:
+            pass
+    
+    async def _count(self, name: str, outcome: str):
+        try:
+            await self.redis.hincrby(COUNTERS_KEY, f"{name}:{outcome}", 1)
+        except RedisError:
+            pass
+
+
+stats_cache = StatsCacheService()
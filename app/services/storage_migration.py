@@ -0,0 +1,131 @@
+import asyncio
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Iterator, List, Optional
+from app.config import settings
+from app.models.checkin import Checkin
+from app.models.stored_image import StoredImage
+from app.models.user import User
+from app.services.user_cache import user_cache
+from app.utils.storage import StorageBackend, image_key, storage
+
+# Paths written before images were sharded: uploads/images/<name>
+FLAT_IMAGE_PATH = re.compile(r"^uploads/images/([\w-]+\.(?:jpg|jpeg|png|gif|webp))$")
+
+# (key, path) columns that may point at uploaded images
+PATH_COLUMNS = [
+    (Checkin.id, Checkin.image),
+    (User.id, User.avatar),
+    (StoredImage.hash, StoredImage.path),
+]
+
+
+class StorageMigrationService:
+    """Moves flat uploads/images files into the storage backend and rewrites the paths pointing at them"""
+    
+    def __init__(self, db: AsyncSession, backend: StorageBackend = storage, upload_dir: str = settings.upload_dir):
+        self.db = db
+        self.backend = backend
+        self.flat_dir = Path(upload_dir) / "images"
+        self.temp_dir = Path(upload_dir) / "temp"
+    
+    def _flat_names(self, batch_size: int) -> Iterator[List[str]]:
+        """Names of the image files directly in uploads/images, in batches"""
+        if not self.flat_dir.is_dir():
+            return
+        
+        batch = []
+        with os.scandir(self.flat_dir) as it:
+            for entry in it:
+                if entry.is_file() and FLAT_IMAGE_PATH.match(f"uploads/images/{entry.name}"):
+                    batch.append(entry.name)
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+    
+    def new_path(self, path: Optional[str]) -> Optional[str]:
+        """Where a flat image path points after the migration, None if it is not one"""
+        match = FLAT_IMAGE_PATH.match(path or "")
+        return self.backend.url(image_key(match.group(1))) if match else None
+    
+    async def _copy(self, name: str) -> bool:
+        key = image_key(name)
+        if await self.backend.exists(key):
+            return False
+        
+        # save() consumes its source, so stage a hard link (or a copy across filesystems)
+        staged = self.temp_dir / f"{uuid.uuid4()}{Path(name).suffix}"
+        try:
+            try:
+                os.link(self.flat_dir / name, staged)
+            except OSError:
+                await run_in_threadpool(shutil.copyfile, self.flat_dir / name, staged)
+            await self.backend.save(key, staged)
+        finally:
+            staged.unlink(missing_ok=True)
+        return True
+    
+    async def copy_files(self, concurrency: int = 8, batch_size: int = 1000) -> int:
+        """Copy every flat file into the backend, several at a time, returns files copied"""
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def copy(name: str) -> bool:
+            async with semaphore:
+                return await self._copy(name)
+        
+        copied = 0
+        for names in self._flat_names(batch_size):
+            copied += sum(await asyncio.gather(*(copy(name) for name in names)))
+        return copied
+    
+    async def rewrite_paths(self, key_column, path_column, batch_size: int = 1000) -> int:
+        """Point the flat image paths of a column at their new location, committing per batch"""
+        model = path_column.class_
+        rewritten = 0
+        last_key = None
+        
+        while True:
+            query = select(key_column, path_column).where(path_column.like("uploads/images/%"))
+            if last_key is not None:
+                query = query.where(key_column > last_key)
+            rows = (await self.db.execute(query.order_by(key_column).limit(batch_size))).all()
+            if not rows:
+                break
+            
+            updates = [
+                {key_column.key: key, path_column.key: self.new_path(path)}
+                for key, path in rows
+                if self.new_path(path)
+            ]
+            if updates:
+                await self.db.execute(update(model), updates)
+                await self.db.commit()
+                
+                # Cached user snapshots still carry the old avatar path
+                if model is User:
+                    for row in updates:
+                        await user_cache.invalidate(row["id"])
+            
+            rewritten += len(updates)
+            last_key = rows[-1][0]
+        
+        return rewritten
+    
+    async def remove_flat_files(self, batch_size: int = 1000) -> int:
+        """Delete flat files whose copy is in the backend, returns files removed"""
+        removed = 0
+        for names in self._flat_names(batch_size):
+            for name in names:
+                if await self.backend.exists(image_key(name)):
+                    (self.flat_dir / name).unlink(missing_ok=True)
+                    removed += 1
+        return removed
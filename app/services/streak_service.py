@@ -0,0 +1,95 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, case, func, literal, select
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from datetime import date
+from app.models.checkin import Checkin
+from app.utils.sql import day_number
+
+
+class HabitStreakSummary(NamedTuple):
+    total_checkins: int
+    last_checkin_date: Optional[date]
+    last_streak: int  # Length of the streak ending at last_checkin_date
+    longest_streak: int
+
+
+class StreakService:
+    """Streak calculation over consecutive check-in dates (gaps and islands)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def _islands(self, habit_ids: List[int]):
+        """Subquery with one row per run of consecutive check-in dates"""
+        # Consecutive dates share the same (day number - row number) value
+        checkin_day = day_number(Checkin.checkin_date)
+        numbered = select(
+            Checkin.habit_id,
+            Checkin.checkin_date,
+            checkin_day.label("day"),
+            (checkin_day - func.row_number().over(
+                partition_by=Checkin.habit_id,
+                order_by=Checkin.checkin_date
+            )).label("island")
+        ).where(Checkin.habit_id.in_(habit_ids)).subquery()
+        
+        return select(
+            numbered.c.habit_id,
+            func.min(numbered.c.day).label("first_day"),
+            func.max(numbered.c.day).label("last_day"),
+            func.max(numbered.c.checkin_date).label("last_date"),
+            func.count().label("length")
+        ).group_by(numbered.c.habit_id, numbered.c.island).subquery()
+    
+    async def get_current_streaks(self, habit_ids: Iterable[int], today: date) -> Dict[int, int]:
+        """Get the run of consecutive check-in days through today for each habit with a single query"""
+        habit_ids = list(habit_ids)
+        if not habit_ids:
+            return {}
+        
+        today_number = day_number(literal(today, Date))
+        islands = self._islands(habit_ids)
+        result = await self.db.execute(
+            select(islands.c.habit_id, (today_number - islands.c.first_day + 1).label("current"))
+            .where(islands.c.first_day <= today_number, islands.c.last_day >= today_number)
+        )
+        
+        streaks = {habit_id: 0 for habit_id in habit_ids}
+        for row in result:
+            streaks[row.habit_id] = int(row.current)
+        return streaks
+    
+    async def get_summaries(self, habit_ids: Iterable[int]) -> Dict[int, HabitStreakSummary]:
+        """Get check-in totals, last check-in date and streaks for each habit with a single query"""
+        habit_ids = list(habit_ids)
+        if not habit_ids:
+            return {}
+        
+        islands = self._islands(habit_ids)
+        ranked = select(
+            islands,
+            func.max(islands.c.last_date).over(partition_by=islands.c.habit_id).label("habit_last_date")
+        ).subquery()
+        
+        result = await self.db.execute(
+            select(
+                ranked.c.habit_id,
+                func.sum(ranked.c.length).label("total_checkins"),
+                func.max(ranked.c.last_date).label("last_checkin_date"),
+                func.max(case(
+                    (ranked.c.last_date == ranked.c.habit_last_date, ranked.c.length),
+                    else_=0
+                )).label("last_streak"),
+                func.max(ranked.c.length).label("longest_streak")
+            ).group_by(ranked.c.habit_id)
+        )
+        
+        summaries = {habit_id: HabitStreakSummary(0, None, 0, 0) for habit_id in habit_ids}
+        for row in result:
+            summaries[row.habit_id] = HabitStreakSummary(
+                int(row.total_checkins),
+                row.last_checkin_date,
+                int(row.last_streak),
+                int(row.longest_streak)
+            )
+        return summaries
@@ -0,0 +1,90 @@
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, NamedTuple, Set
+from app.config import settings
+from app.models.checkin import Checkin
+from app.models.user import User
+from app.utils.storage import StorageBackend, StoredFile, file_name, storage
+
+# Indexed file names of the paths or URLs of uploaded files
+NAME_COLUMNS = [Checkin.image_name, User.avatar_name]
+
+
+class GCReport(NamedTuple):
+    scanned: int
+    deleted: int
+    bytes_reclaimed: int
+
+
+class UploadGCService:
+    """Deletes uploaded files nothing refers to, a batch at a time so memory stays flat on huge directories"""
+    
+    def __init__(self, db: AsyncSession, backend: StorageBackend = storage, upload_dir: str = settings.upload_dir):
+        self.db = db
+        self.backend = backend
+        self.temp_dir = Path(upload_dir) / "temp"
+    
+    async def _referenced(self, files: List[StoredFile]) -> Set[str]:
+        """Keys of the files some check-in or avatar still points at"""
+        # Paths may carry a host or an older URL prefix, so match on the indexed file name
+        names = {file_name(stored.key): stored.key for stored in files}
+        referenced = set()
+        for column in NAME_COLUMNS:
+            for name in await self.db.scalars(select(column).where(column.in_(names)).distinct()):
+                referenced.add(names[name])
+        return referenced
+    
+    async def collect_images(self, grace: timedelta, batch_size: int = 1000, dry_run: bool = False) -> GCReport:
+        """Delete unreferenced images last modified before the grace period"""
+        cutoff = time.time() - grace.total_seconds()
+        scanned = deleted = reclaimed = 0
+        batch: List[StoredFile] = []
+        
+        async def collect():
+            nonlocal deleted, reclaimed
+            referenced = await self._referenced(batch)
+            for stored in batch:
+                if stored.key in referenced:
+                    continue
+                if not dry_run:
+                    await self.backend.delete(stored.key)
+                deleted += 1
+                reclaimed += stored.size
+            batch.clear()
+        
+        for stored in self.backend.iter_files("images/"):
+            scanned += 1
+            if stored.modified < cutoff:
+                batch.append(stored)
+                if len(batch) == batch_size:
+                    await collect()
+        
+        if batch:
+            await collect()
+        
+        return GCReport(scanned, deleted, reclaimed)
+    
+    def collect_temp(self, grace: timedelta, dry_run: bool = False) -> GCReport:
+        """Delete leftovers of interrupted uploads from uploads/temp"""
+        cutoff = time.time() - grace.total_seconds()
+        scanned = deleted = reclaimed = 0
+        
+        if self.temp_dir.is_dir():
+            with os.scandir(self.temp_dir) as it:
+                for entry in it:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    scanned += 1
+                    stat = entry.stat()
+                    if stat.st_mtime >= cutoff:
+                        continue
+                    if not dry_run:
+                        os.unlink(entry.path)
+                    deleted += 1
+                    reclaimed += stat.st_size
+        
+        return GCReport(scanned, deleted, reclaimed)
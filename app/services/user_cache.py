@@ -0,0 +1,82 @@
+import json
+from redis.exceptions import RedisError
+from sqlalchemy.orm import make_transient_to_detached
+from typing import Optional, Tuple
+from datetime import datetime
+from app.config import settings
+from app.database import redis_client
+from app.models.user import User
+from app.services.stats_cache import stats_cache
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Columns kept in a snapshot, enough to serve UserResponse
+SNAPSHOT_FIELDS = ("id", "openid", "nickname", "avatar", "points")
+SNAPSHOT_DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+class UserCacheService:
+    """Short-lived Redis snapshots of user rows used to authenticate requests.
+    
+    Snapshots are tagged with the user's data version (the counter bumped by
+    ``stats_cache.invalidate``), so a snapshot written from a row read before a
+    concurrent update is ignored as soon as that update commits.
+    """
+    
+    def __init__(self, redis=redis_client, ttl: int = settings.user_cache_ttl):
+        self.redis = redis
+        self.ttl = ttl
+    
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"user:snapshot:{user_id}"
+    
+    async def get(self, user_id: int) -> Tuple[Optional[User], Optional[int]]:
+        """Get a detached user from its snapshot, and the current data version.
+        
+        The version is None when Redis is unavailable.
+        """
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(stats_cache.version_key(user_id))
+                pipe.get(self.key(user_id))
+                version, snapshot = await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"User snapshot cache unavailable: {e}")
+            return None, None
+        
+        version = int(version or 0)
+        if snapshot is None:
+            return None, version
+        
+        data = json.loads(snapshot)
+        if data.pop("version") != version:
+            return None, version
+        
+        for field in SNAPSHOT_DATETIME_FIELDS:
+            if data[field] is not None:
+                data[field] = datetime.fromisoformat(data[field])
+        user = User(**data)
+        make_transient_to_detached(user)
+        return user, version
+    
+    async def set(self, user: User, version: int):
+        """Store a snapshot of a user row read at the given data version"""
+        data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+        for field in SNAPSHOT_DATETIME_FIELDS:
+            value = getattr(user, field)
+            data[field] = value.isoformat() if value is not None else None
+        data["version"] = version
+        
+        try:
+            await self.redis.set(self.key(user.id), json.dumps(data), ex=self.ttl)
+        except RedisError as e:
+            logger.warning(f"Failed to store snapshot for user {user.id}: {e}")
+    
+    async def invalidate(self, user_id: int):
+        """Drop the user's snapshot (and cached statistics), call after committing"""
+        await stats_cache.invalidate(user_id)
+
+
+user_cache = UserCacheService()
@@ -0,0 +1,51 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
+from app.models.user import User
+from app.utils.sql import upsert
+
+
+class UserService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def login(self, openid: str, nickname: Optional[str] = None, avatar: Optional[str] = None) -> Tuple[User, bool]:
+        """Find or create the user of an openid and apply profile changes, returns (user, whether it was written)"""
+        nickname = nickname or None
+        avatar = avatar or None
+        
+        # Returning users whose profile did not change need no write at all
+        user = await self.db.scalar(select(User).where(User.openid == openid))
+        if user is not None and (nickname or user.nickname) == user.nickname and (avatar or user.avatar) == user.avatar:
+            return user, False
+        
+        # Insert or update in one statement, so concurrent first logins cannot collide
+        table = User.__table__
+        stmt = upsert(
+            self.db.bind.dialect.name,
+            User,
+            {"openid": openid, "nickname": nickname, "avatar": avatar},
+            ["openid"],
+            lambda proposed: {
+                "nickname": func.coalesce(proposed.nickname, table.c.nickname),
+                "avatar": func.coalesce(proposed.avatar, table.c.avatar),
+                "avatar_name": func.coalesce(proposed.avatar_name, table.c.avatar_name),
+                "updated_at": func.now()
+            }
+        )
+        
+        options = {"populate_existing": True}
+        if self.db.bind.dialect.insert_returning:
+            user = await self.db.scalar(stmt.returning(User), execution_options=options)
+        else:
+            # MySQL has no RETURNING, read the row back in the same transaction. The read
+            # locks, so it sees the latest committed row rather than the snapshot of the first
+            # SELECT (an upsert that changed nothing leaves another login's new row invisible)
+            await self.db.execute(stmt)
+            user = await self.db.scalar(
+                select(User).where(User.openid == openid).with_for_update(),
+                execution_options=options
+            )
+        
+        await self.db.commit()
+        return user, True
@@ -1,12 +1,18 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-import httpx
 from app.config import settings
+from app.utils.wechat import wechat_client
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified tokens by SHA-256 hash, mapped to (payload, expiry timestamp)
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -23,34 +29,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str):
     """Verify JWT token and return payload"""
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(token_hash)
+    if cached is not None:
+        payload, expires_at = cached
+        if expires_at > time.time():
+            _token_cache.move_to_end(token_hash)
+            return payload
+        del _token_cache[token_hash]
+    
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         user_id: int = payload.get("sub")
         if user_id is None:
             return None
-        return {"user_id": user_id}
     except JWTError:
         return None
+    
+    # Remember the verified token until it expires
+    result = {"user_id": user_id}
+    _token_cache[token_hash] = (result, payload.get("exp", 0))
+    if len(_token_cache) > settings.token_cache_size:
+        _token_cache.popitem(last=False)
+    return result
 
 
 async def get_wechat_openid(code: str) -> Optional[str]:
     """Get WeChat openid from code"""
-    url = "https://api.weixin.qq.com/sns/jscode2session"
-    params = {
-        "appid": settings.wechat_app_id,
-        "secret": settings.wechat_app_secret,
-        "js_code": code,
-        "grant_type": "authorization_code"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params)
-            data = response.json()
-            
-            if "openid" in data:
-                return data["openid"]
-            else:
-                return None
-        except Exception:
-            return None
+    return await wechat_client.code_to_openid(code)
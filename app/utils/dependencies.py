@@ -1,18 +1,18 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
+from app.services.user_cache import user_cache
 from app.utils.auth import verify_token
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
+def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> int:
+    """Get the authenticated user id from the bearer token"""
     token = credentials.credentials
     payload = verify_token(token)
     
@@ -23,14 +23,47 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id = payload.get("user_id")
-    user = db.query(User).filter(User.id == user_id).first()
+    return int(payload.get("user_id"))
+
+
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_user(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user, possibly from a short-lived cached snapshot"""
+    user, version = await user_cache.get(user_id)
+    # Kept for ETags of per-user resources, read in the same round trip as the snapshot
+    request.state.data_version = version
+    if user is not None:
+        return user
+    
+    user = await db.get(User, user_id)
     
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _user_not_found()
+    
+    if version is not None:
+        await user_cache.set(user, version)
+    return user
+
+
+async def get_current_user_fresh(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user read from the database, for point changes"""
+    user = await db.get(User, user_id)
+    
+    if user is None:
+        raise _user_not_found()
     
     return user
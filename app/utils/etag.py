@@ -0,0 +1,55 @@
+import hashlib
+from fastapi import Request, Response, status
+from typing import Optional
+from datetime import date
+
+# Bump when a versioned response changes shape, so clients drop the copies they hold
+ETAG_REVISION = 1
+
+# Per-user responses may be kept by the client but must be revalidated on every use
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag of a fixed response body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def user_data_etag(request: Request, name: str, user_id: int) -> Optional[str]:
+    """ETag of a per-user resource at the data version get_current_user read, None without one"""
+    version = getattr(request.state, "data_version", None)
+    if version is None:
+        return None
+    # Streaks and rates depend on the current day as well as the data
+    return f'W/"{name}.{ETAG_REVISION}.{user_id}.{version}.{date.today().isoformat()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names the given ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: Optional[str],
+    cache_control: str = PRIVATE_CACHE_CONTROL
+) -> Optional[Response]:
+    """Set the validator headers, returns a 304 to send instead if the client's copy is current"""
+    if etag is None:
+        return None
+    
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return None
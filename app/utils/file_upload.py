@@ -1,10 +1,110 @@
+import asyncio
+import hashlib
+import multiprocessing
 import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Optional
 from fastapi import UploadFile, HTTPException, status
 from PIL import Image
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.utils.storage import image_key, storage
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Bytes read from an upload and written to disk at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the accepted image formats, with the extension they are stored under
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Extension of the image format a file starts with, or None if it is not a supported image"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def compress_image(file_path: str, max_width: int = 800, quality: int = 85):
+    """Compress image to reduce file size (runs in an image worker process)"""
+    try:
+        with Image.open(file_path) as img:
+            # Convert RGBA to RGB if necessary
+            if img.mode in ("RGBA", "P"):
+                img = img.convert("RGB")
+            
+            # Resize if too large
+            if img.width > max_width:
+                ratio = max_width / img.width
+                new_height = int(img.height * ratio)
+                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+            
+            # Save with compression
+            img.save(file_path, optimize=True, quality=quality)
+    except Exception:
+        # If compression fails, keep original file
+        pass
+
+
+class ImageProcessor:
+    """Runs Pillow work in a bounded process pool so it never blocks the event loop"""
+    
+    def __init__(self, workers: int = settings.image_workers, queue_size: int = settings.image_queue_size):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily; spawned workers do not inherit the server's threads and sockets
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    async def run(self, func, *args):
+        """Run func(*args) in a worker process, rejecting work when the queue is full"""
+        if self.pending >= self.capacity:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A worker died, start a fresh pool for the next job
+            self._executor = None
+            raise
+        finally:
+            self.pending -= 1
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_processor = ImageProcessor()
 
 
 class FileUploadService:
@@ -13,68 +113,61 @@ class FileUploadService:
         self.upload_dir.mkdir(exist_ok=True)
         
         # Create subdirectories
-        (self.upload_dir / "images").mkdir(exist_ok=True)
         (self.upload_dir / "temp").mkdir(exist_ok=True)
     
     async def upload_image(self, file: UploadFile, max_size: int = None) -> str:
-        """Upload and process image file"""
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be an image"
-            )
-        
-        # Check file size
+        """Stream an image to disk in chunks, validate it and store it under its content hash"""
         max_size = max_size or settings.max_file_size
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
         
-        if file_size > max_size:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size exceeds {max_size} bytes"
-            )
-        
-        # Generate unique filename
-        file_extension = file.filename.split(".")[-1].lower()
-        if file_extension not in ["jpg", "jpeg", "png", "gif", "webp"]:
+        # Validate the format from the file's magic bytes, not the client's filename
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        file_extension = sniff_image_type(chunk)
+        if file_extension is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Unsupported image format"
             )
         
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = self.upload_dir / "images" / unique_filename
+        # Name the file after its content so repeated uploads share one copy
+        digest = hashlib.sha256()
+        temp_path = self.upload_dir / "temp" / f"{uuid.uuid4()}.{file_extension}"
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Compress image if needed
-        await self._compress_image(file_path)
+        try:
+            # Copy chunk by chunk, giving up as soon as the limit is exceeded
+            file_size = 0
+            with open(temp_path, "wb") as f:
+                while chunk:
+                    file_size += len(chunk)
+                    if file_size > max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File size exceeds {max_size} bytes"
+                        )
+                    digest.update(chunk)
+                    await run_in_threadpool(f.write, chunk)
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            
+            key = image_key(f"{digest.hexdigest()}.{file_extension}")
+            
+            # Compress new images, then hand them to the storage backend
+            if await storage.exists(key):
+                # Keep the garbage collector off a file that is about to be referenced again
+                await storage.touch(key)
+            else:
+                await self._compress_image(temp_path)
+                await storage.save(key, temp_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
         
-        return f"uploads/images/{unique_filename}"
+        return storage.url(key)
     
     async def _compress_image(self, file_path: Path, max_width: int = 800, quality: int = 85):
-        """Compress image to reduce file size"""
+        """Compress image to reduce file size, in the image worker pool"""
         try:
-            with Image.open(file_path) as img:
-                # Convert RGBA to RGB if necessary
-                if img.mode in ("RGBA", "P"):
-                    img = img.convert("RGB")
-                
-                # Resize if too large
-                if img.width > max_width:
-                    ratio = max_width / img.width
-                    new_height = int(img.height * ratio)
-                    img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Save with compression
-                img.save(file_path, optimize=True, quality=quality)
-        except Exception:
+            await image_processor.run(compress_image, str(file_path), max_width, quality)
+        except BrokenProcessPool as e:
             # If compression fails, keep original file
-            pass
+            logger.warning(f"Image worker failed while compressing {file_path}: {e}")
     
     def delete_file(self, file_path: str) -> bool:
         """Delete uploaded file"""
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.utils.file_upload import image_processor
+from app.utils.logging import get_logger
+from app.utils.storage import storage
+
+logger = get_logger(__name__)
+
+# Widths a variant may be requested at, keep in sync with the nginx.conf map
+VARIANT_WIDTHS = (60, 120, 240, 480)
+
+# Output formats a variant may be converted to, with their Pillow names
+VARIANT_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP", "gif": "GIF"}
+
+# Image paths below uploads/images, sharded (ab/cd/<name>) or flat from before sharding
+IMAGE_PATH = re.compile(r"^(?:[\w-]{2}/[\w-]{2}/)?(?P<stem>[\w-]+)\.(?P<ext>jpg|jpeg|png|gif|webp)$")
+
+# Evictions stop once the cache is back under this share of the budget
+EVICTION_LOW_WATER = 0.9
+
+
+def resize_image(source: str, target: str, width: int, fmt: str, quality: int = 80):
+    """Write a resized copy of an image in the given format (runs in an image worker process)"""
+    with Image.open(source) as img:
+        if img.width > width:
+            img = img.resize((width, int(img.height * width / img.width)), Image.Resampling.LANCZOS)
+        
+        # JPEG has no alpha channel, palette images need one for WebP
+        if VARIANT_FORMATS[fmt] == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif VARIANT_FORMATS[fmt] == "WEBP" and img.mode == "P":
+            img = img.convert("RGBA")
+        
+        img.save(target, VARIANT_FORMATS[fmt], optimize=True, quality=quality)
+
+
+class ImageVariantCache:
+    """Resized image variants on disk, evicted least recently used first under a byte budget.
+    
+    Variants are plain files under uploads/variants so nginx can serve them directly;
+    recency comes from file access/modification times, which the app bumps on the hits it sees.
+    """
+    
+    def __init__(self, upload_dir: str = settings.upload_dir, max_bytes: int = settings.image_variant_cache_bytes):
+        self.temp_dir = Path(upload_dir) / "temp"
+        self.variants_dir = Path(upload_dir) / "variants"
+        self.variants_dir.mkdir(parents=True, exist_ok=True)
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.total_bytes: Optional[int] = None  # Unknown until the first scan
+        self._inflight: Dict[Path, asyncio.Future] = {}
+    
+    async def original_key(self, path: str) -> str:
+        """Storage key of a stored original, 404 if the path is not one"""
+        key = f"images/{path}"
+        if not IMAGE_PATH.match(path) or not await storage.exists(key):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Image not found"
+            )
+        return key
+    
+    def variant_path(self, path: str, width: int, fmt: Optional[str]) -> Path:
+        """Path of a variant, sharded like the nginx.conf try_files rule expects"""
+        match = IMAGE_PATH.match(path)
+        stem = match["stem"]
+        return self.variants_dir / stem[:2] / stem[2:4] / f"{stem}.w{width}.{fmt or match['ext']}"
+    
+    async def get(self, path: str, width: int, fmt: Optional[str]) -> Path:
+        """Path of a variant, generating it on a miss"""
+        if width not in VARIANT_WIDTHS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Width must be one of {', '.join(map(str, VARIANT_WIDTHS))}"
+            )
+        if fmt is not None and fmt not in VARIANT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Format must be one of {', '.join(VARIANT_FORMATS)}"
+            )
+        
+        key = await self.original_key(path)
+        target = self.variant_path(path, width, fmt)
+        
+        try:
+            # Hit: mark it recently used
+            os.utime(target)
+            return target
+        except FileNotFoundError:
+            pass
+        
+        # Concurrent requests for the same variant share one resize
+        future = self._inflight.get(target)
+        if future is None:
+            future = asyncio.ensure_future(self._generate(key, target, width, fmt or target.suffix[1:]))
+            self._inflight[target] = future
+            future.add_done_callback(lambda _: self._inflight.pop(target, None))
+        await asyncio.shield(future)
+        return target
+    
+    async def _generate(self, key: str, target: Path, width: int, fmt: str):
+        source = storage.local_path(key)
+        fetched = None
+        
+        # Written under a temporary name so nginx never serves a partial file
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{uuid.uuid4()}{target.suffix}")
+        try:
+            # Remote backends are resized from a temporary local copy
+            if source is None:
+                source = fetched = self.temp_dir / f"{uuid.uuid4()}{Path(key).suffix}"
+                await storage.download(key, fetched)
+            
+            await image_processor.run(resize_image, str(source), str(partial), width, fmt)
+            os.replace(partial, target)
+        finally:
+            partial.unlink(missing_ok=True)
+            if fetched is not None:
+                fetched.unlink(missing_ok=True)
+        
+        if self.total_bytes is not None:
+            self.total_bytes += target.stat().st_size
+        if self.total_bytes is None or self.total_bytes > self.max_bytes:
+            self.total_bytes = await run_in_threadpool(self._evict)
+    
+    def _evict(self) -> int:
+        """Delete least recently used variants until under the low water mark, returns bytes kept"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.variants_dir):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return total
+        
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICTION_LOW_WATER:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        
+        logger.info(f"Evicted {evicted} image variants, {total} bytes cached")
+        return total
+
+
+image_variants = ImageVariantCache()
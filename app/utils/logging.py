@@ -22,6 +22,8 @@ def setup_logging():
     # Set specific loggers
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    # httpx logs full request URLs, which carry the WeChat app secret
+    logging.getLogger("httpx").setLevel(logging.WARNING)
     
     return logging.getLogger(__name__)
 
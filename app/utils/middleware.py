@@ -0,0 +1,28 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """Reject upload requests whose declared Content-Length is over the limit before reading the body"""
+    
+    def __init__(self, app: ASGIApp, max_size: int, path_prefix: str = "/api/upload"):
+        self.app = app
+        self.max_size = max_size
+        self.path_prefix = path_prefix
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"].startswith(self.path_prefix):
+            headers = dict(scope["headers"])
+            content_length = headers.get(b"content-length", b"")
+            if content_length.isdigit() and int(content_length) > self.max_size + MULTIPART_OVERHEAD:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"File size exceeds {self.max_size} bytes"}
+                )
+                await response(scope, receive, send)
+                return
+        
+        await self.app(scope, receive, send)
@@ -0,0 +1,50 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from typing import Any, Callable, List, Optional, Tuple
+
+# Page sizes accepted by paginated endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    """Opaque cursor pointing just after a row"""
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse: Callable[[str], Any]) -> Tuple[Any, int]:
+    """Decode a cursor into its (sort value, id), parsing the sort value with parse"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return parse(sort_value), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_page(query, sort_column, id_column, limit: int, after: Optional[Tuple[Any, int]] = None):
+    """Newest-first page of a query starting after (sort value, id), with one extra row to detect more"""
+    if after is not None:
+        sort_value, row_id = after
+        query = query.where(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows: List, limit: int, sort_attr: str) -> Tuple[List, Optional[str]]:
+    """Trim the extra row fetched by keyset_page and build the next page's cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_attr), last.id)
@@ -0,0 +1,104 @@
+import re
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from typing import Dict, List, Sequence, Tuple
+from datetime import date, timedelta
+from app.database import Base
+from app.utils.auth import create_access_token
+
+
+def hot_requests(habit_id: int) -> List[str]:
+    """Read-only requests to the busiest endpoints, for a habit of the requesting user"""
+    today = date.today()
+    month_ago = today - timedelta(days=29)
+    return [
+        "/api/auth/me",
+        "/api/habits/",
+        f"/api/habits/{habit_id}",
+        "/api/checkins/?limit=1",
+        f"/api/checkins/?habit_id={habit_id}&start_date={month_ago}&end_date={today}",
+        f"/api/checkins/calendar/{habit_id}?year={today.year}&month={today.month}",
+        f"/api/checkins/calendar?habit_ids={habit_id}&start_date={month_ago}&end_date={today}",
+        f"/api/checkins/calendar/{habit_id}/{today}",
+        "/api/statistics/overview",
+        "/api/statistics/habits",
+        "/api/statistics/daily",
+        "/api/statistics/trends",
+        "/api/points/summary",
+        "/api/points/history?limit=1",
+    ]
+
+
+class QueryRecorder:
+    """Collects the SQL an engine sends, with its parameters, while in a ``with`` block"""
+    
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine.sync_engine
+        self.statements: List[Tuple[str, Sequence]] = []
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            self.statements.append((statement, parameters))
+    
+    def __enter__(self) -> "QueryRecorder":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+async def request_all(client: httpx.AsyncClient, paths: List[str], user_id: int):
+    """GET each path as a user, following one next page where there is one"""
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    for path in paths:
+        response = await client.get(path, headers=headers)
+        # A day without a check-in is a 404, its queries have still run
+        if response.status_code == 404:
+            continue
+        response.raise_for_status()
+        
+        next_cursor = response.json().get("next_cursor") if isinstance(response.json(), dict) else None
+        if next_cursor:
+            separator = "&" if "?" in path else "?"
+            (await client.get(f"{path}{separator}cursor={next_cursor}", headers=headers)).raise_for_status()
+
+
+async def explain(conn: AsyncConnection, statement: str, parameters: Sequence) -> List[str]:
+    """Tables a statement reads with a full table (or full index) scan"""
+    tables = set(Base.metadata.tables)
+    
+    if conn.dialect.name == "sqlite":
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        scanned = [re.match(r"SCAN (\w+)", row.detail) for row in rows]
+        return [match.group(1) for match in scanned if match and match.group(1) in tables]
+    
+    rows = (await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).mappings()
+    return [row["table"] for row in rows if row["type"] in ("ALL", "index") and row["table"] in tables]
+
+
+async def explain_all(engine: AsyncEngine, statements: List[Tuple[str, Sequence]]) -> Dict[str, List[str]]:
+    """Explain each distinct statement, mapping its SQL to the tables it fully scans"""
+    results = {}
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement not in results:
+                results[statement] = await explain(conn, statement, parameters)
+    return results
+
+
+async def check_query_plans(engine: AsyncEngine, user_id: int, habit_id: int) -> Dict[str, List[str]]:
+    """Call the hot endpoints in process as a user and explain every statement they ran"""
+    # Imported here, the app imports most of the modules this one is used next to
+    from app.main import app
+    from app.services.stats_cache import stats_cache
+    
+    # Cached responses would skip the queries, start from a new data version
+    await stats_cache.invalidate(user_id)
+    
+    with QueryRecorder(engine) as recorder:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://query-plans") as client:
+            await request_all(client, hot_requests(habit_id), user_id)
+    
+    return await explain_all(engine, recorder.statements)
@@ -0,0 +1,46 @@
+from sqlalchemy import Integer
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class day_number(FunctionElement):
+    """Integer day number of a DATE expression (consecutive dates differ by 1)"""
+    type = Integer()
+    inherit_cache = True
+    name = "day_number"
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):
+    return "(%s - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "mysql")
+def _day_number_mysql(element, compiler, **kw):
+    return "TO_DAYS(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    return "CAST(julianday(%s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+def upsert(dialect_name: str, table, values, index_elements, set_=None):
+    """INSERT that updates (or, without set_, skips) rows conflicting on index_elements.
+    
+    set_ is called with the proposed row (MySQL ``inserted``, SQLite ``excluded``)
+    and returns the column values to apply to the existing row.
+    """
+    if dialect_name == "mysql":
+        stmt = mysql_insert(table).values(values)
+        if set_ is None:
+            # Assigning a key column to itself turns the conflict into a no-op
+            return stmt.on_duplicate_key_update({index_elements[0]: table.c[index_elements[0]]})
+        return stmt.on_duplicate_key_update(set_(stmt.inserted))
+    
+    stmt = sqlite_insert(table).values(values)
+    if set_ is None:
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded))
@@ -0,0 +1,224 @@
+import mimetypes
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+
+# Stored files never change under a given key, so clients and proxies may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class StoredFile(NamedTuple):
+    key: str
+    size: int
+    modified: float  # Unix timestamp
+
+
+def file_name(path: str) -> str:
+    """Last segment of a storage key, path or URL"""
+    return path.rsplit("/", 1)[-1]
+
+
+def file_name_default(column: str):
+    """Column default holding the file name of the path in another column, for lookups by name"""
+    def default(context) -> Optional[str]:
+        path = context.get_current_parameters().get(column)
+        return file_name(path) if path else None
+    return default
+
+
+def image_key(name: str) -> str:
+    """Storage key of an image file, fanned out into two levels of prefix directories"""
+    return f"images/{name[:2]}/{name[2:4]}/{name}"
+
+
+class StorageBackend(ABC):
+    """Where uploaded files are kept, addressed by keys like images/ab/cd/<name>"""
+    
+    @abstractmethod
+    async def save(self, key: str, source: Path):
+        """Store a local file under key, consuming the file"""
+        ...
+    
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+    
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+    
+    @abstractmethod
+    async def download(self, key: str, target: Path):
+        """Copy a stored file to a local path"""
+        ...
+    
+    @abstractmethod
+    async def touch(self, key: str):
+        """Mark a file as just uploaded, restarting its garbage collection grace period"""
+        ...
+    
+    @abstractmethod
+    def iter_files(self, prefix: str) -> Iterator[StoredFile]:
+        """Lazily list the files under a key prefix"""
+        ...
+    
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Path or URL clients load the file from, as saved in Checkin.image"""
+        ...
+    
+    def local_path(self, key: str) -> Optional[Path]:
+        """Local file of a key, None when files are not on this machine"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Files under the upload directory, served by nginx at /uploads/"""
+    
+    def __init__(self, root: str = settings.upload_dir, url_prefix: str = "uploads"):
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+    
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+    
+    async def save(self, key: str, source: Path):
+        path = self.local_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+    
+    async def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+    
+    async def delete(self, key: str):
+        self.local_path(key).unlink(missing_ok=True)
+    
+    async def download(self, key: str, target: Path):
+        await run_in_threadpool(shutil.copyfile, self.local_path(key), target)
+    
+    async def touch(self, key: str):
+        os.utime(self.local_path(key))
+    
+    def iter_files(self, prefix: str) -> Iterator[StoredFile]:
+        directory = self.root / prefix
+        if directory.is_dir():
+            yield from self._walk(directory)
+    
+    def _walk(self, directory: Path) -> Iterator[StoredFile]:
+        # One open scandir iterator per level, so memory does not grow with the file count
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._walk(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    key = Path(entry.path).relative_to(self.root).as_posix()
+                    yield StoredFile(key, stat.st_size, stat.st_mtime)
+    
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+
+class S3Storage(StorageBackend):
+    """Files in an S3-compatible bucket (AWS S3, MinIO, COS...), needs boto3"""
+    
+    def __init__(
+        self,
+        bucket: str = settings.s3_bucket,
+        endpoint_url: Optional[str] = settings.s3_endpoint_url,
+        region: Optional[str] = settings.s3_region,
+        access_key_id: Optional[str] = settings.s3_access_key_id,
+        secret_access_key: Optional[str] = settings.s3_secret_access_key,
+        public_url: Optional[str] = settings.s3_public_url
+    ):
+        # Blank values in .env mean "not set"
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self.access_key_id = access_key_id or None
+        self.secret_access_key = secret_access_key or None
+        self.public_url = (public_url or f"{self.endpoint_url or 'https://s3.amazonaws.com'}/{bucket}").rstrip("/")
+        self._client = None
+    
+    @property
+    def client(self):
+        # Imported on first use so the local backend works without boto3 installed
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("The s3 storage backend needs boto3, install it with `pip install boto3`")
+            
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                region_name=self.region,
+                aws_access_key_id=self.access_key_id,
+                aws_secret_access_key=self.secret_access_key
+            )
+        return self._client
+    
+    def _object_args(self, key: str) -> dict:
+        args = {"CacheControl": IMMUTABLE_CACHE_CONTROL}
+        content_type = mimetypes.guess_type(key)[0]
+        if content_type:
+            args["ContentType"] = content_type
+        return args
+    
+    async def save(self, key: str, source: Path):
+        await run_in_threadpool(
+            self.client.upload_file, str(source), self.bucket, key, ExtraArgs=self._object_args(key)
+        )
+        source.unlink(missing_ok=True)
+    
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        
+        try:
+            await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+    
+    async def delete(self, key: str):
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+    
+    async def download(self, key: str, target: Path):
+        await run_in_threadpool(self.client.download_file, self.bucket, key, str(target))
+    
+    async def touch(self, key: str):
+        # S3 has no utime, copying an object onto itself renews LastModified
+        await run_in_threadpool(
+            self.client.copy_object,
+            Bucket=self.bucket,
+            Key=key,
+            CopySource={"Bucket": self.bucket, "Key": key},
+            MetadataDirective="REPLACE",
+            **self._object_args(key)
+        )
+    
+    def iter_files(self, prefix: str) -> Iterator[StoredFile]:
+        # Pages of up to 1000 keys are fetched as the caller consumes them
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield StoredFile(obj["Key"], obj["Size"], obj["LastModified"].timestamp())
+    
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+
+def get_storage() -> StorageBackend:
+    """Storage backend selected by STORAGE_BACKEND"""
+    if settings.storage_backend == "s3":
+        return S3Storage()
+    return LocalStorage()
+
+
+storage = get_storage()
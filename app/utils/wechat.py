@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import httpx
+from fastapi import HTTPException, status
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# errcode WeChat returns when it is busy and did not process the request
+WECHAT_BUSY = -1
+
+
+class WeChatClient:
+    """code2session calls over one pooled keep-alive connection, de-duplicated and cached per code"""
+    
+    def __init__(
+        self,
+        base_url: str = settings.wechat_api_base_url,
+        connect_timeout: float = settings.wechat_connect_timeout,
+        read_timeout: float = settings.wechat_read_timeout,
+        retries: int = settings.wechat_retries,
+        cache_ttl: int = settings.wechat_code_cache_ttl,
+        cache_size: int = 10000
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # openid by code, mapped to (openid, expiry timestamp)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                # Only failed connections are retried, a request that reached WeChat may have used up the code.
+                # Pool limits go to the transport, the client ignores its own once a transport is given
+                transport=httpx.AsyncHTTPTransport(
+                    retries=self.retries,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                )
+            )
+        return self._client
+    
+    async def code_to_openid(self, code: str) -> Optional[str]:
+        """openid for a login code, None if WeChat rejects the code"""
+        cached = self._cache.get(code)
+        if cached is not None:
+            openid, expires_at = cached
+            if expires_at > time.time():
+                return openid
+            del self._cache[code]
+        
+        # A code can only be exchanged once, so concurrent logins with it share one request
+        future = self._inflight.get(code)
+        if future is None:
+            future = asyncio.ensure_future(self._exchange(code))
+            self._inflight[code] = future
+            future.add_done_callback(lambda _: self._inflight.pop(code, None))
+        return await asyncio.shield(future)
+    
+    async def _exchange(self, code: str) -> Optional[str]:
+        params = {
+            "appid": settings.wechat_app_id,
+            "secret": settings.wechat_app_secret,
+            "js_code": code,
+            "grant_type": "authorization_code"
+        }
+        
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.get("/sns/jscode2session", params=params)
+                response.raise_for_status()
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                # The request URL carries the app secret, so only the error type is logged
+                status_code = getattr(getattr(e, "response", None), "status_code", "")
+                logger.warning(f"WeChat code2session failed: {type(e).__name__} {status_code}".rstrip())
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="WeChat login is temporarily unavailable"
+                )
+            
+            if "openid" in data:
+                self._remember(code, data["openid"])
+                return data["openid"]
+            
+            if data.get("errcode") != WECHAT_BUSY or attempt == self.retries:
+                logger.warning(f"WeChat code2session rejected a code: errcode={data.get('errcode')} {data.get('errmsg')}")
+                return None
+            
+            await asyncio.sleep(0.1 * (attempt + 1))
+    
+    def _remember(self, code: str, openid: str):
+        self._cache[code] = (openid, time.time() + self.cache_ttl)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    async def aclose(self):
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+wechat_client = WeChatClient()
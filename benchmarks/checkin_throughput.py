@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Sequential POST /checkins over in-process ASGI on SQLite, with the number of
+SQL statements each check-in sends.
+
+HABITS habits get a check-in on each of DAYS days, one request at a time.
+
+    python benchmarks/checkin_throughput.py [--tree PATH] [--habits 20] [--days 15]
+"""
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+import common
+
+
+async def run(app, headers: dict, habit_ids: list, days: int):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    
+    statements = 0
+    
+    def count(*args):
+        nonlocal statements
+        statements += 1
+    
+    start = date.today() - timedelta(days=days - 1)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Warm up the connection pool and the token path
+        await client.get("/api/auth/me", headers=headers)
+        
+        event.listen(Engine, "before_cursor_execute", count)
+        started = time.perf_counter()
+        for day in range(days):
+            for habit_id in habit_ids:
+                response = await client.post(
+                    "/api/checkins/",
+                    json={"habit_id": habit_id, "checkin_date": (start + timedelta(days=day)).isoformat()},
+                    headers=headers
+                )
+                response.raise_for_status()
+        elapsed = time.perf_counter() - started
+        event.remove(Engine, "before_cursor_execute", count)
+        
+        points = (await client.get("/api/auth/me", headers=headers)).json()["points"]
+    
+    total = len(habit_ids) * days
+    print(f"{total} check-ins in {elapsed:.2f} s: {total / elapsed:.0f} check-ins/s, "
+          f"{statements / total:.1f} statements per check-in, {points} points awarded")
+
+
+def main():
+    parser = common.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--habits", type=int, default=20)
+    parser.add_argument("--days", type=int, default=15)
+    args = parser.parse_args()
+    
+    common.use_tree(args.tree)
+    app = common.start_app()
+    user_id = common.insert("users", [{"openid": "bench", "points": 0}])[0]
+    created = datetime.combine(date.today() - timedelta(days=args.days - 1), datetime.min.time())
+    habit_ids = common.insert("habits", [
+        {"user_id": user_id, "name": f"habit {n}", "created_at": created} for n in range(args.habits)
+    ])
+    
+    asyncio.run(run(app, common.auth_headers(user_id), habit_ids, args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Shared setup for the benchmarks: the source tree to measure, a throwaway SQLite
+database, seed rows and an optional uvicorn server.
+
+Every script takes --tree, a checkout of the revision to measure (default: this
+one), so before/after numbers come from running one script against two trees:
+    
+    git worktree add /tmp/before <commit>^
+    python benchmarks/<script>.py --tree /tmp/before
+    python benchmarks/<script>.py
+"""
+import argparse
+import atexit
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--tree", default=str(REPO), help="Source tree to measure (default: this checkout)")
+    return parser
+
+
+def use_tree(tree: str, env: Optional[Dict[str, str]] = None) -> Path:
+    """Point this process at a source tree and a new SQLite database, before the app is imported.
+    
+    Runs in a temp directory, so logs/ and uploads/ do not land in the tree. Returns the directory.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="habit-tracker-bench-"))
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "DEBUG": "false",
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        **(env or {})
+    })
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    sys.path.insert(0, str(Path(tree).resolve()))
+    os.chdir(workdir)
+    return workdir
+
+
+def start_app():
+    """Import the tree's app with an in-memory Redis and create its tables, returns the ASGI app"""
+    import redis.asyncio
+    from sqlalchemy import create_engine
+    from app import database
+    
+    # Trees that use Redis get fakeredis instead of a server, so their caches work as in production
+    if isinstance(database.redis_client, redis.asyncio.Redis):
+        import fakeredis
+        server = fakeredis.FakeServer()
+        database.redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        if hasattr(database, "redis_bytes_client"):
+            database.redis_bytes_client = fakeredis.FakeAsyncRedis(server=server)
+    
+    from app.main import app
+    database.Base.metadata.create_all(create_engine(os.environ["DATABASE_URL"]))
+    # Request logs would dominate the output
+    logging.disable(logging.WARNING)
+    return app
+
+
+def insert(table: str, rows: List[dict]) -> List[int]:
+    """Insert rows into a table of the tree's schema, returns their ids"""
+    from sqlalchemy import create_engine
+    from app.database import Base
+    
+    table = Base.metadata.tables[table]
+    with create_engine(os.environ["DATABASE_URL"]).begin() as conn:
+        return [conn.execute(table.insert().values(row)).inserted_primary_key[0] for row in rows]
+
+
+def insert_many(table: str, rows: List[dict]):
+    """Insert many rows into a table of the tree's schema with one executemany"""
+    from sqlalchemy import create_engine
+    from app.database import Base
+    
+    with create_engine(os.environ["DATABASE_URL"]).begin() as conn:
+        conn.execute(Base.metadata.tables[table].insert(), rows)
+
+
+def auth_headers(user_id: int) -> dict:
+    from app.utils.auth import create_access_token
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def _serve(tree: str, environ: Dict[str, str], workdir: str, port: int):
+    os.environ.clear()
+    os.environ.update(environ)
+    sys.path.insert(0, str(Path(tree).resolve()))
+    os.chdir(workdir)
+    import uvicorn
+    uvicorn.run(start_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+def serve(tree: str) -> str:
+    """Run the tree's app under uvicorn in a child process (one worker), returns its base URL"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    
+    # Not a daemon, the app may start worker processes of its own
+    process = multiprocessing.get_context("spawn").Process(
+        target=_serve, args=(tree, dict(os.environ), os.getcwd(), port)
+    )
+    process.start()
+    atexit.register(process.terminate)
+    
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return f"http://127.0.0.1:{port}"
+        except OSError:
+            if not process.is_alive():
+                raise RuntimeError("The app server failed to start")
+            time.sleep(0.1)
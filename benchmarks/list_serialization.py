@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Cost of serializing list responses, for the orjson / selected-columns change.
+
+Seeds 10k check-ins and 10k point records for one user, then walks every page
+of GET /checkins and GET /points/history (100 rows per page) over in-process
+ASGI and hashes the payloads, so two trees can be checked for identical output.
+
+--micro also times serializing 10k check-ins both ways in one process: ORM
+rows through model_validate, response_model validation and the stdlib json
+encoder, against selected columns through row_dicts and ORJSONResponse. It
+needs a tree that has app.utils.serialization.
+
+    python benchmarks/list_serialization.py [--tree PATH] [--micro]
+"""
+import asyncio
+import hashlib
+import time
+from datetime import date, datetime, time as day_time, timedelta
+
+import httpx
+import common
+
+ROWS = 10000
+PAGE_SIZE = 100
+
+
+def seed() -> int:
+    user_id = common.insert("users", [{"openid": "bench", "points": 0}])[0]
+    habit_ids = common.insert("habits", [
+        {"user_id": user_id, "name": f"habit {n}", "reminder_time": day_time(7, 30)} for n in range(20)
+    ])
+    common.insert_many("checkins", [
+        {
+            "habit_id": habit_ids[i % 20],
+            "user_id": user_id,
+            "checkin_date": date(2026, 10, 1) - timedelta(days=i // 20),
+            "checkin_time": datetime(2026, 1, 1, 8, 0, 0, 123456 * (i % 2)),
+            "note": "note" if i % 2 else None
+        }
+        for i in range(ROWS)
+    ])
+    common.insert_many("point_records", [
+        {
+            "user_id": user_id,
+            "points": 10,
+            "type": "earn",
+            "reason": "daily_checkin",
+            "created_at": datetime(2026, 1, 1) + timedelta(minutes=i)
+        }
+        for i in range(ROWS)
+    ])
+    return user_id
+
+
+async def walk(app, headers: dict):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for path in (f"/api/checkins/?limit={PAGE_SIZE}", f"/api/points/history?limit={PAGE_SIZE}"):
+            digest = hashlib.sha256()
+            pages = 0
+            url = path
+            started = time.perf_counter()
+            while url:
+                response = await client.get(url, headers=headers)
+                response.raise_for_status()
+                page = response.json()
+                digest.update(repr(page).encode())
+                pages += 1
+                url = f"{path}&cursor={page['next_cursor']}" if page.get("next_cursor") else None
+            elapsed = (time.perf_counter() - started) / pages * 1000
+            print(f"{path:<32} {pages} pages, {elapsed:.2f} ms/page, payload sha256 {digest.hexdigest()[:16]}")
+
+
+def best_of(call, runs: int = 5) -> float:
+    call()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def micro():
+    import json
+    import os
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+    from app.models.checkin import Checkin
+    from app.schemas.checkin import CheckinPage, CheckinResponse
+    from app.utils.serialization import row_dicts, schema_columns
+    
+    db = Session(create_engine(os.environ["DATABASE_URL"]))
+    page = TypeAdapter(CheckinPage)
+    
+    def before(checkins):
+        # ORM rows into models, validated again as the response_model and encoded with json
+        content = CheckinPage(items=[CheckinResponse.model_validate(checkin) for checkin in checkins], next_cursor=None)
+        return JSONResponse(page.dump_python(page.validate_python(content), mode="json")).body
+    
+    def after(rows):
+        return ORJSONResponse({"items": row_dicts(rows), "next_cursor": None}).body
+    
+    def load_before():
+        db.expunge_all()
+        return db.scalars(select(Checkin).limit(ROWS)).all()
+    
+    def load_after():
+        return db.execute(select(*schema_columns(Checkin, CheckinResponse)).limit(ROWS)).all()
+    
+    checkins, rows = load_before(), load_after()
+    assert json.loads(before(checkins)) == json.loads(after(rows))
+    print(f"serialize {ROWS} check-ins:        before {best_of(lambda: before(checkins)):.0f} ms, "
+          f"after {best_of(lambda: after(rows)):.0f} ms")
+    print(f"load + serialize {ROWS} check-ins: before {best_of(lambda: before(load_before())):.0f} ms, "
+          f"after {best_of(lambda: after(load_after())):.0f} ms")
+
+
+def main():
+    parser = common.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--micro", action="store_true", help="Also time serialization alone, in this tree")
+    args = parser.parse_args()
+    
+    common.use_tree(args.tree)
+    app = common.start_app()
+    user_id = seed()
+    
+    asyncio.run(walk(app, common.auth_headers(user_id)))
+    if args.micro:
+        micro()
+
+
+if __name__ == "__main__":
+    main()
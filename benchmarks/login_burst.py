@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Bursts of POST /auth/login against uvicorn (one worker) on SQLite, with
+jscode2session answered by a local fake WeChat server.
+
+- concurrent first logins of one openid
+- returning logins with an unchanged profile
+- a burst of new codes where one in four is sent twice (a client retry)
+
+    python benchmarks/login_burst.py [--tree PATH] [--latency 0.05]
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import httpx
+import common
+
+sys.path.append(str(common.REPO))
+from tests.fake_wechat import FakeWeChat
+
+
+async def burst(client: httpx.AsyncClient, logins: list) -> tuple:
+    """Send (code, nickname) logins at once, returns (status counts, latencies, seconds)"""
+    latencies = []
+    
+    async def login(code: str, nickname: str):
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/auth/login", json={"code": code, "nickname": nickname})
+        except httpx.TransportError as e:
+            return type(e).__name__
+        latencies.append(time.perf_counter() - started)
+        return response.status_code
+    
+    started = time.perf_counter()
+    statuses = Counter(await asyncio.gather(*[login(code, nickname) for code, nickname in logins]))
+    return dict(sorted(statuses.items(), key=str)), latencies, time.perf_counter() - started
+
+
+def count_users(openid: str) -> int:
+    import os
+    from sqlalchemy import create_engine, text
+    
+    with create_engine(os.environ["DATABASE_URL"]).connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM users WHERE openid = :openid"), {"openid": openid}).scalar()
+
+
+async def run(base_url: str, fake: FakeWeChat, returning_users: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=1000)) as client:
+        await client.get("/health")
+        
+        codes = [f"first-{i}" for i in range(50)]
+        for code in codes:
+            fake.answers[code] = [{"openid": "shared-openid"}]
+        statuses, _, _ = await burst(client, [(code, "new") for code in codes])
+        print(f"50 concurrent first logins of one openid: {statuses}, {count_users('shared-openid')} users row(s)")
+        
+        # Register the returning users, then log each in 4 more times with the same profile
+        for i in range(returning_users):
+            fake.answers[f"register-{i}"] = [{"openid": f"user-{i}"}]
+        await burst(client, [(f"register-{i}", "name") for i in range(returning_users)])
+        logins = []
+        for i in range(returning_users * 4):
+            fake.answers[f"returning-{i}"] = [{"openid": f"user-{i % returning_users}"}]
+            logins.append((f"returning-{i}", "name"))
+        statuses, latencies, elapsed = await burst(client, logins)
+        print(f"{len(logins)} returning logins, unchanged profile: {len(logins) / elapsed:.0f}/s, "
+              f"p99 {common.percentile(latencies, 0.99):.1f} s, {statuses}")
+        
+        codes = [f"burst-{i}" for i in range(250)]
+        logins = [(code, "burst") for code in codes + codes[:len(codes) // 4]]
+        statuses, _, _ = await burst(client, logins)
+        errors = sum(count for code, count in statuses.items() if code != 200)
+        print(f"{len(logins)}-login burst with retried codes: {statuses}, {errors} errors")
+
+
+def main():
+    parser = common.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake WeChat takes per request")
+    parser.add_argument("--returning-users", type=int, default=100)
+    args = parser.parse_args()
+    
+    with FakeWeChat(latency=args.latency) as fake:
+        common.use_tree(args.tree, {"WECHAT_API_BASE_URL": fake.base_url})
+        common.start_app()
+        asyncio.run(run(common.serve(args.tree), fake, args.returning_users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Mixed load against uvicorn (one worker) on SQLite, for the switch to AsyncSession.
+
+USERS concurrent users each loop over 4 POST /checkins and one GET
+/statistics/overview, while another client polls /health every 50 ms to show
+how long the event loop is blocked.
+
+    python benchmarks/mixed_load.py [--tree PATH] [--users 10] [--seconds 15]
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+import common
+
+HABITS_PER_USER = 4
+
+
+async def user_loop(client: httpx.AsyncClient, headers: dict, habit_ids: list, deadline: float, results: dict):
+    day = date.today()
+    while time.perf_counter() < deadline:
+        for habit_id in habit_ids:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/checkins/", json={"habit_id": habit_id, "checkin_date": day.isoformat()}, headers=headers
+            )
+            results["checkin"].append(time.perf_counter() - started)
+            results["status"][response.status_code] += 1
+        
+        started = time.perf_counter()
+        response = await client.get("/api/statistics/overview", headers=headers)
+        results["overview"].append(time.perf_counter() - started)
+        results["status"][response.status_code] += 1
+        day -= timedelta(days=1)
+
+
+async def poll_health(client: httpx.AsyncClient, deadline: float, latencies: list):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+async def run(base_url: str, users: list, seconds: float):
+    results = {"checkin": [], "overview": [], "health": [], "status": Counter()}
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=200)) as client:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(
+            poll_health(client, deadline, results["health"]),
+            *[user_loop(client, headers, habit_ids, deadline, results) for headers, habit_ids in users]
+        )
+    
+    requests = len(results["checkin"]) + len(results["overview"])
+    ms = lambda values, q: f"{common.percentile(values, q) * 1000:.0f}"
+    print(f"throughput        {requests / seconds:.0f} req/s")
+    print(f"check-in p50/p99  {ms(results['checkin'], 0.5)}/{ms(results['checkin'], 0.99)} ms")
+    print(f"overview p99      {ms(results['overview'], 0.99)} ms")
+    print(f"/health p99       {ms(results['health'], 0.99)} ms")
+    print(f"errors            {sum(count for code, count in results['status'].items() if code >= 400)}")
+
+
+def main():
+    parser = common.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args()
+    
+    common.use_tree(args.tree)
+    common.start_app()
+    users = []
+    for i in range(args.users):
+        user_id = common.insert("users", [{"openid": f"bench-{i}", "points": 0}])[0]
+        habit_ids = common.insert("habits", [{"user_id": user_id, "name": f"habit {n}"} for n in range(HABITS_PER_USER)])
+        users.append((common.auth_headers(user_id), habit_ids))
+    
+    asyncio.run(run(common.serve(args.tree), users, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
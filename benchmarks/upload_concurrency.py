@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Concurrent large image uploads against uvicorn (one worker), while another
+client polls /health to show how long the event loop is blocked.
+
+Uploads a generated 2600x2000 JPEG (about 5 MB) UPLOADS times at once.
+
+    python benchmarks/upload_concurrency.py [--tree PATH] [--uploads 24]
+"""
+import asyncio
+import io
+import os
+import time
+from collections import Counter
+
+import httpx
+import common
+
+
+def photo() -> bytes:
+    """A JPEG that compresses about as badly as a camera photo"""
+    from PIL import Image
+    
+    image = Image.frombytes("RGB", (2600, 2000), os.urandom(2600 * 2000 * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def run(base_url: str, headers: dict, data: bytes, uploads: int):
+    health = []
+    done = False
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        await client.get("/health")
+        
+        async def poll():
+            while not done:
+                started = time.perf_counter()
+                await client.get("/health")
+                health.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+        
+        async def upload() -> int:
+            response = await client.post(
+                "/api/upload/image", files={"file": ("photo.jpg", data, "image/jpeg")}, headers=headers
+            )
+            return response.status_code
+        
+        poller = asyncio.create_task(poll())
+        started = time.perf_counter()
+        statuses = Counter(await asyncio.gather(*[upload() for _ in range(uploads)]))
+        elapsed = time.perf_counter() - started
+        done = True
+        await poller
+    
+    print(f"{uploads} uploads of {len(data) / 1024 / 1024:.1f} MB in {elapsed:.1f} s "
+          f"({statuses[200] / elapsed:.1f} accepted/s), status codes {dict(sorted(statuses.items()))}")
+    print(f"/health p50 {common.percentile(health, 0.5) * 1000:.0f} ms, "
+          f"p99 {common.percentile(health, 0.99) * 1000:.0f} ms over {len(health)} polls")
+
+
+def main():
+    parser = common.parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=24)
+    args = parser.parse_args()
+    
+    data = photo()
+    common.use_tree(args.tree, {"MAX_FILE_SIZE": str(len(data) * 2)})
+    common.start_app()
+    user_id = common.insert("users", [{"openid": "bench", "points": 0}])[0]
+    
+    asyncio.run(run(common.serve(args.tree), common.auth_headers(user_id), data, args.uploads))
+
+
+if __name__ == "__main__":
+    main()
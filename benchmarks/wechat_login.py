@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Latency of WeChat code exchanges against a local fake jscode2session server.
+
+Fires CODES distinct codes plus REPEATS repeated ones at once, as a burst
+of mini-program logins would, and compares a new httpx client per call
+(the code before the pooled WeChatClient) with the pooled client, cold
+and again for new codes once its connections are open.
+
+    python benchmarks/wechat_login.py [--codes 300] [--repeats 75] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from app.utils.wechat import WeChatClient
+from tests.fake_wechat import FakeWeChat
+
+
+async def timed(call) -> float:
+    started = time.perf_counter()
+    await call
+    return time.perf_counter() - started
+
+
+async def client_per_call(base_url: str, code: str):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get("/sns/jscode2session", params={"js_code": code})
+        return response.json().get("openid")
+
+
+def report(name: str, total: float, latencies: list, fake: FakeWeChat):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<18} {total:6.1f} s total, p50 {statistics.median(latencies) * 1000:6.0f} ms, "
+        f"p99 {p99 * 1000:6.0f} ms, {sum(fake.calls.values())} WeChat calls over {len(fake.peers)} connections"
+    )
+
+
+async def run(args):
+    codes = [f"code-{i}" for i in range(args.codes)]
+    burst = codes + codes[:args.repeats]
+    
+    with FakeWeChat(latency=args.latency) as fake:
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*[timed(client_per_call(fake.base_url, code)) for code in burst])
+        report("client per call:", time.perf_counter() - started, latencies, fake)
+    
+    with FakeWeChat(latency=args.latency) as fake:
+        wechat = WeChatClient(base_url=fake.base_url)
+        for phase in ("cold", "warm"):
+            fake.calls.clear()
+            fake.peers.clear()
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*[timed(wechat.code_to_openid(f"{phase}-{code}")) for code in burst])
+            report(f"pooled, {phase}:", time.perf_counter() - started, latencies, fake)
+        await wechat.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--codes", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=75)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake takes per request")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from sqlalchemy import select
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models import user, habit, checkin, point_record, habit_stats, user_daily_stats, point_summary, stored_image
+from app.services.checkin_index import checkin_index
+from app.services.daily_stats_service import DailyStatsService
+from app.services.habit_stats_service import HabitStatsService
+from app.services.image_service import ImageService
+from app.services.storage_migration import PATH_COLUMNS, StorageMigrationService
+from app.services.upload_gc import UploadGCService
+from app.services.stats_cache import stats_cache
+from app.utils.query_plans import check_query_plans as explain_hot_queries
+
+
+async def recompute_habit_stats(args):
+    """Rebuild habit_stats rows from the checkins table"""
+    async with AsyncSessionLocal() as db:
+        processed = await HabitStatsService(db).recompute_all(batch_size=args.batch_size)
+    print(f"Recomputed stats for {processed} habits")
+
+
+async def backfill_daily_stats(args):
+    """Build the user_daily_stats rollup from checkins and point_records"""
+    async with AsyncSessionLocal() as db:
+        written = await DailyStatsService(db).backfill(batch_size=args.batch_size)
+    print(f"Wrote {written} daily rollup rows")
+
+
+async def rebuild_checkin_index(args):
+    """Rebuild the Redis check-in bitmaps from the checkins table"""
+    async with AsyncSessionLocal() as db:
+        indexed = await checkin_index.rebuild(db, batch_size=args.batch_size)
+    print(f"Indexed check-ins of {indexed} habits")
+
+
+async def recount_image_refs(args):
+    """Rebuild stored_images reference counts from checkins"""
+    async with AsyncSessionLocal() as db:
+        referenced = await ImageService(db).recount_all()
+    print(f"Recounted references for {referenced} images")
+
+
+async def migrate_storage(args):
+    """Move flat uploads/images files into the storage backend and rewrite their paths"""
+    async with AsyncSessionLocal() as db:
+        service = StorageMigrationService(db)
+        
+        copied = await service.copy_files(concurrency=args.concurrency)
+        print(f"Copied {copied} files to {settings.storage_backend} storage")
+        
+        for key_column, path_column in PATH_COLUMNS:
+            rewritten = await service.rewrite_paths(key_column, path_column, batch_size=args.batch_size)
+            print(f"Rewrote {rewritten} {path_column.class_.__tablename__}.{path_column.key} paths")
+        
+        if not args.keep_old:
+            removed = await service.remove_flat_files()
+            print(f"Removed {removed} old files")
+
+
+async def gc_uploads(args):
+    """Delete uploaded files no check-in or avatar refers to"""
+    grace = timedelta(hours=args.grace_hours)
+    async with AsyncSessionLocal() as db:
+        service = UploadGCService(db)
+        images = await service.collect_images(grace, batch_size=args.batch_size, dry_run=args.dry_run)
+        temp = service.collect_temp(grace, dry_run=args.dry_run)
+    
+    verb = "would delete" if args.dry_run else "deleted"
+    for name, report in (("images", images), ("temp", temp)):
+        print(
+            f"{name}: scanned {report.scanned} files, {verb} {report.deleted}, "
+            f"{report.bytes_reclaimed / 1024 / 1024:.1f} MiB reclaimed"
+        )
+
+
+async def show_cache_stats(args):
+    """Print statistics cache hit/miss counters"""
+    counters = await stats_cache.get_counters()
+    for name in sorted({field.rsplit(":", 1)[0] for field in counters}):
+        hits = counters.get(f"{name}:hit", 0)
+        misses = counters.get(f"{name}:miss", 0)
+        total = hits + misses
+        ratio = hits / total * 100 if total else 0
+        print(f"{name}: {hits} hits, {misses} misses ({ratio:.1f}% hit rate)")
+
+
+async def check_query_plans(args):
+    """Fail if any query of the hot endpoints falls back to a full scan"""
+    habit_id = args.habit_id
+    if habit_id is None:
+        async with AsyncSessionLocal() as db:
+            habit_id = await db.scalar(select(habit.Habit.id).where(habit.Habit.user_id == args.user_id).limit(1))
+    
+    results = await explain_hot_queries(async_engine, args.user_id, habit_id or 0)
+    for statement, scanned in results.items():
+        status = f"FULL SCAN of {', '.join(scanned)}" if scanned else "ok"
+        print(f"{status}: {' '.join(statement.split())}")
+    
+    if any(results.values()):
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Habit Tracker maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    recompute_stats = subparsers.add_parser(
+        "recompute-habit-stats",
+        help="Repair habit_stats rows from the checkins table"
+    )
+    recompute_stats.add_argument("--batch-size", type=int, default=500)
+    recompute_stats.set_defaults(func=recompute_habit_stats)
+    
+    backfill_daily = subparsers.add_parser(
+        "backfill-daily-stats",
+        help="Build the user_daily_stats rollup from checkins and point_records"
+    )
+    backfill_daily.add_argument("--batch-size", type=int, default=200, help="Users per batch")
+    backfill_daily.set_defaults(func=backfill_daily_stats)
+    
+    rebuild_index = subparsers.add_parser(
+        "rebuild-checkin-index",
+        help="Rebuild the Redis check-in bitmaps from the checkins table"
+    )
+    rebuild_index.add_argument("--batch-size", type=int, default=500, help="Habits per batch")
+    rebuild_index.set_defaults(func=rebuild_checkin_index)
+    
+    recount_images = subparsers.add_parser(
+        "recount-image-refs",
+        help="Rebuild stored_images reference counts from checkins"
+    )
+    recount_images.set_defaults(func=recount_image_refs)
+    
+    migrate = subparsers.add_parser(
+        "migrate-storage",
+        help="Move flat uploads/images files into the configured storage backend and rewrite their paths"
+    )
+    migrate.add_argument("--concurrency", type=int, default=8, help="Files copied at a time")
+    migrate.add_argument("--batch-size", type=int, default=1000, help="Rows rewritten per transaction")
+    migrate.add_argument("--keep-old", action="store_true", help="Leave the flat files in place")
+    migrate.set_defaults(func=migrate_storage)
+    
+    gc = subparsers.add_parser(
+        "gc-uploads",
+        help="Delete uploaded images nothing refers to and stale temp files"
+    )
+    gc.add_argument("--grace-hours", type=float, default=24, help="Keep files modified more recently than this")
+    gc.add_argument("--batch-size", type=int, default=1000, help="Files checked per reference lookup")
+    gc.add_argument("--dry-run", action="store_true", help="Report without deleting")
+    gc.set_defaults(func=gc_uploads)
+    
+    cache_stats = subparsers.add_parser(
+        "cache-stats",
+        help="Show statistics cache hit/miss counters"
+    )
+    cache_stats.set_defaults(func=show_cache_stats)
+    
+    query_plans = subparsers.add_parser(
+        "check-query-plans",
+        help="EXPLAIN the queries of the hot endpoints and fail on full table scans (run against production-sized data)"
+    )
+    query_plans.add_argument("--user-id", type=int, required=True, help="User to send the requests as, ideally one with much data")
+    query_plans.add_argument("--habit-id", type=int, help="Habit of that user to request (default: any)")
+    query_plans.set_defaults(func=check_query_plans)
+    
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    asyncio.run(args.func(args))
@@ -0,0 +1,127 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database and an unreachable Redis before it is imported,
+# the Redis-backed caches fall back to the database as they do when Redis is down
+_database_dir = tempfile.mkdtemp(prefix="habit-tracker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+os.environ["DEBUG"] = "false"
+
+import fakeredis
+import httpx
+import pytest
+from typing import Iterable, List
+from datetime import date
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.main import app
+from app.models import user, habit, checkin, point_record, habit_stats, user_daily_stats, point_summary, stored_image
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.checkin import Checkin
+from app.services.checkin_index import checkin_index
+from app.services.stats_cache import stats_cache
+from app.services.user_cache import user_cache
+from app.services.habit_stats_service import HabitStatsService
+from app.utils.auth import create_access_token
+
+
+def auth_headers(user_id: int) -> dict:
+    """Bearer token header of a user"""
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", help="also run tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: takes a minute or more, only run with --run-slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="slow, run with --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+class Factory:
+    """Creates test rows through the test's session, committed so requests see them"""
+    
+    def __init__(self, db):
+        self.db = db
+    
+    async def _add(self, rows: list) -> list:
+        self.db.add_all(rows)
+        await self.db.commit()
+        return rows
+    
+    async def user(self, openid: str = "user", **fields) -> User:
+        fields.setdefault("points", 0)
+        return (await self._add([User(openid=openid, **fields)]))[0]
+    
+    async def habits(self, user: User, count: int = 1, **fields) -> List[Habit]:
+        return await self._add([Habit(user_id=user.id, name=f"habit {i}", **fields) for i in range(count)])
+    
+    async def habit(self, user: User, **fields) -> Habit:
+        return (await self.habits(user, **fields))[0]
+    
+    async def checkins(self, habit: Habit, dates: Iterable[date], **fields) -> List[Checkin]:
+        return await self._add([
+            Checkin(habit_id=habit.id, user_id=habit.user_id, checkin_date=day, **fields)
+            for day in dates
+        ])
+    
+    async def checkin(self, habit: Habit, day: date, **fields) -> Checkin:
+        return (await self.checkins(habit, [day], **fields))[0]
+    
+    async def stats(self, habits: Iterable[Habit]):
+        """Build the habit_stats rows of habits created with their check-ins in place"""
+        await HabitStatsService(self.db).recompute([habit.id for habit in habits])
+        await self.db.commit()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """Session on freshly created tables, dropped again after the test"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    async with AsyncSessionLocal() as session:
+        yield session
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+
+
+@pytest.fixture
+def factory(db) -> Factory:
+    return Factory(db)
+
+
+@pytest.fixture
+async def client(db):
+    """HTTP client calling the app in process, on the same database as ``db``"""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """In-memory Redis behind the Redis-backed services, in place of the unreachable one"""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(checkin_index, "redis", fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(stats_cache, "redis", fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(user_cache, "redis", fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    return fakeredis.FakeAsyncRedis(server=server)
@@ -0,0 +1,63 @@
+import asyncio
+import socket
+import threading
+import uvicorn
+from collections import Counter
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from typing import Dict, List, Union
+
+
+class FakeWeChat:
+    """Local jscode2session server on a free port, run in a thread.
+    
+    Each code gets the openid "openid-<code>" unless ``answers`` has replies
+    queued for it: a dict is returned as JSON, an int as a bare HTTP status.
+    """
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.answers: Dict[str, List[Union[dict, int]]] = {}
+        self._server = uvicorn.Server(uvicorn.Config(
+            Starlette(routes=[Route("/sns/jscode2session", self._code2session)]),
+            log_level="warning",
+            limit_concurrency=10000,
+            backlog=4096
+        ))
+        self._socket = socket.socket()
+        self._socket.bind(("127.0.0.1", 0))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._socket]}, daemon=True)
+        # Client (host, port) pairs seen, one per connection
+        self.peers = set()
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._socket.getsockname()[1]}"
+    
+    async def _code2session(self, request: Request):
+        code = request.query_params["js_code"]
+        self.calls[code] += 1
+        self.peers.add((request.client.host, request.client.port))
+        
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        queued = self.answers.get(code)
+        answer = queued.pop(0) if queued else {"openid": f"openid-{code}", "session_key": "key"}
+        if isinstance(answer, int):
+            return Response(status_code=answer)
+        return JSONResponse(answer)
+    
+    def __enter__(self) -> "FakeWeChat":
+        self._thread.start()
+        while not self._server.started:
+            threading.Event().wait(0.01)
+        return self
+    
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+        self._socket.close()
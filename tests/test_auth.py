@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+from app.api import auth
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def wechat(monkeypatch):
+    """Answer code exchanges locally, a code "<openid>-<n>" belongs to <openid>"""
+    async def get_wechat_openid(code: str):
+        return code.rsplit("-", 1)[0]
+    
+    monkeypatch.setattr(auth, "get_wechat_openid", get_wechat_openid)
+
+
+async def test_concurrent_first_logins_create_one_user(db, client):
+    responses = await asyncio.gather(*[
+        client.post("/api/auth/login", json={"code": f"new-user-{i}", "nickname": "new"})
+        for i in range(20)
+    ])
+    
+    assert [response.status_code for response in responses] == [200] * 20
+    assert len({response.json()["user"]["id"] for response in responses}) == 1
+    assert await db.scalar(select(func.count()).select_from(User).where(User.openid == "new-user")) == 1
+
+
+async def test_login_keeps_profile_fields_that_are_not_sent(db, client):
+    await client.post("/api/auth/login", json={"code": "profile-1", "nickname": "name", "avatar": "a.jpg"})
+    
+    response = await client.post("/api/auth/login", json={"code": "profile-2", "avatar": "b.jpg"})
+    
+    assert response.status_code == 200
+    assert response.json()["user"]["nickname"] == "name"
+    assert response.json()["user"]["avatar"] == "b.jpg"
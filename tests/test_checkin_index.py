@@ -0,0 +1,117 @@
+import pytest
+from sqlalchemy import event
+from datetime import date, timedelta
+from app.database import async_engine
+from app.services.checkin_index import checkin_index, encode_bitmap
+from tests.conftest import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+def calendar_path(habit_id: int, day: date) -> str:
+    return f"/api/checkins/calendar/{habit_id}?year={day.year}&month={day.month}"
+
+
+class CheckinQueries:
+    """Counts the statements that read the checkins table"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if "FROM checkins" in statement:
+            self.count += 1
+    
+    def __enter__(self):
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self)
+
+
+async def test_check_ins_through_the_api_are_indexed(db, factory, client, redis):
+    user = await factory.user()
+    headers = auth_headers(user.id)
+    today = date.today()
+    
+    response = await client.post("/api/habits/", json={"name": "read"}, headers=headers)
+    assert response.status_code == 200
+    habit_id = response.json()["id"]
+    assert await redis.exists(checkin_index.key(habit_id))
+    
+    response = await client.post(
+        "/api/checkins/",
+        json={"habit_id": habit_id, "checkin_date": today.isoformat()},
+        headers=headers
+    )
+    assert response.status_code == 200
+    response = await client.post(
+        "/api/checkins/batch",
+        json={"items": [{"habit_id": habit_id, "checkin_date": (today + timedelta(days=1)).isoformat()}]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    
+    assert await redis.bitcount(checkin_index.key(habit_id), 4, -1) == 2
+    response = await client.get(calendar_path(habit_id, today), headers=headers)
+    assert today.isoformat() in response.json()["calendar"]
+
+
+async def test_empty_month_is_answered_without_reading_checkins(db, factory, client, redis):
+    habit = await factory.habit(await factory.user())
+    today = date.today()
+    await factory.checkin(habit, today)
+    await factory.stats([habit])
+    await checkin_index.rebuild(db)
+    
+    with CheckinQueries() as queries:
+        response = await client.get(calendar_path(habit.id, today + timedelta(days=62)), headers=auth_headers(habit.user_id))
+    assert response.status_code == 200
+    assert response.json()["calendar"] == {}
+    assert queries.count == 0
+    
+    with CheckinQueries() as queries:
+        response = await client.get(calendar_path(habit.id, today), headers=auth_headers(habit.user_id))
+    assert list(response.json()["calendar"]) == [today.isoformat()]
+    assert queries.count == 1
+
+
+@pytest.mark.parametrize("damage", ["missing", "lost write"])
+async def test_stale_bitmap_falls_back_to_sql_and_is_rebuilt(db, factory, client, redis, damage):
+    habit = await factory.habit(await factory.user())
+    days = [date(2024, 3, 10), date(2024, 3, 11)]
+    await factory.checkins(habit, days)
+    await factory.stats([habit])
+    if damage == "lost write":
+        await redis.set(checkin_index.key(habit.id), encode_bitmap(days[0], days[1:]))
+    
+    response = await client.get(calendar_path(habit.id, days[0]), headers=auth_headers(habit.user_id))
+    assert sorted(response.json()["calendar"]) == [day.isoformat() for day in days]
+    assert await redis.bitcount(checkin_index.key(habit.id), 4, -1) == 2
+
+
+async def test_check_in_before_the_origin_drops_the_bitmap(db, factory, redis):
+    habit = await factory.habit(await factory.user())
+    today = date.today()
+    await redis.set(checkin_index.key(habit.id), encode_bitmap(today, []))
+    
+    await checkin_index.mark([(habit.id, today - timedelta(days=3))])
+    assert not await redis.exists(checkin_index.key(habit.id))
+    
+    # The rebuild starts the bitmap at the earliest check-in
+    await factory.checkin(habit, today - timedelta(days=3))
+    await factory.stats([habit])
+    assert await checkin_index.count_checkins(db, habit, today - timedelta(days=3), today, 1) is None
+    assert await checkin_index.count_checkins(db, habit, today - timedelta(days=3), today, 1) == 1
+
+
+async def test_calendar_without_redis_reads_sql(db, factory, client):
+    habit = await factory.habit(await factory.user())
+    today = date.today()
+    await factory.checkin(habit, today)
+    await factory.stats([habit])
+    
+    response = await client.get(calendar_path(habit.id, today), headers=auth_headers(habit.user_id))
+    assert response.status_code == 200
+    assert list(response.json()["calendar"]) == [today.isoformat()]
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import select
+from datetime import date, timedelta
+from app.models.habit_stats import HabitStat
+from app.services.habit_stats_service import HabitStatsService
+from tests.conftest import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+STAT_COLUMNS = ("total_checkins", "last_checkin_date", "last_streak", "longest_streak", "recent_days")
+
+
+async def stored_stats(db, habit_id: int) -> tuple:
+    stats = await db.scalar(
+        select(HabitStat).where(HabitStat.habit_id == habit_id).execution_options(populate_existing=True)
+    )
+    return tuple(getattr(stats, column) for column in STAT_COLUMNS)
+
+
+async def recomputed_stats(db, habit_id: int) -> tuple:
+    stats = (await HabitStatsService(db).recompute([habit_id]))[habit_id]
+    await db.rollback()
+    return tuple(getattr(stats, column) for column in STAT_COLUMNS)
+
+
+@pytest.mark.parametrize("batch_days_ago", [[0, 5], [5, 0], [0, 2, 3], [3, 0, 2]])
+async def test_batch_keeps_habit_stats_identical_to_a_recompute(db, factory, client, batch_days_ago):
+    habit = await factory.habit(await factory.user())
+    today = date.today()
+    headers = auth_headers(habit.user_id)
+    
+    response = await client.post(
+        "/api/checkins/",
+        json={"habit_id": habit.id, "checkin_date": (today - timedelta(days=1)).isoformat()},
+        headers=headers
+    )
+    assert response.status_code == 200
+    
+    response = await client.post(
+        "/api/checkins/batch",
+        json={"items": [
+            {"habit_id": habit.id, "checkin_date": (today - timedelta(days=days_ago)).isoformat()}
+            for days_ago in batch_days_ago
+        ]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert all(item["checkin"] for item in response.json()["items"])
+    
+    stats = await stored_stats(db, habit.id)
+    assert stats[0] == 1 + len(batch_days_ago)
+    assert stats == await recomputed_stats(db, habit.id)
+
+
+async def test_calendar_without_habit_ids_is_a_client_error(db, factory, client):
+    habit = await factory.habit(await factory.user())
+    today = date.today().isoformat()
+    path = f"/api/checkins/calendar?start_date={today}&end_date={today}"
+    
+    response = await client.get(path, headers=auth_headers(habit.user_id))
+    assert response.status_code == 400
+    
+    too_many = "".join(f"&habit_ids={habit_id}" for habit_id in range(1, 60))
+    response = await client.get(path + too_many, headers=auth_headers(habit.user_id))
+    assert response.status_code == 422
+    
+    response = await client.get(path + f"&habit_ids={habit.id}", headers=auth_headers(habit.user_id))
+    assert response.status_code == 200
+    assert [calendar["habit_id"] for calendar in response.json()["habits"]] == [habit.id]
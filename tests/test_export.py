@@ -0,0 +1,124 @@
+import asyncio
+import gc
+import os
+import pytest
+from datetime import date, timedelta
+from app.database import engine
+from app.main import app
+from app.services.export_service import EXPORT_BATCH_SIZE
+from tests.conftest import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+EXPORT_ROWS = 1_000_000
+HABITS = 1000
+
+# Check-ins of the quick streaming test in the default run
+SMALL_EXPORT_ROWS = 5000
+
+# Growth of the process RSS allowed while exporting EXPORT_ROWS check-ins
+RSS_CEILING_BYTES = 64 * 2**20
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def seed_history(rows: int):
+    """One user with HABITS habits and `rows` check-ins, inserted through the raw driver"""
+    start = date(2020, 1, 1)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO users (id, openid, points) VALUES (1, 'export', 0)")
+        cursor.executemany(
+            "INSERT INTO habits (id, user_id, name, status, frequency) VALUES (?, 1, ?, 'active', 'daily')",
+            [(habit_id, f"habit {habit_id}") for habit_id in range(1, HABITS + 1)]
+        )
+        cursor.executemany(
+            "INSERT INTO checkins (habit_id, user_id, checkin_date, checkin_time, note, is_makeup) "
+            "VALUES (?, 1, ?, '2020-01-01 08:00:00', 'note, with \"quotes\"', 0)",
+            (
+                (i % HABITS + 1, (start + timedelta(days=i // HABITS)).isoformat())
+                for i in range(rows)
+            )
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+async def stream_get(path: str, query: str, user_id: int, on_chunk) -> int:
+    """GET through the ASGI interface, handing body chunks over as they are sent; returns the status.
+    
+    httpx's ASGITransport collects the whole body before returning, which defeats the measurement.
+    """
+    status_code = None
+    requested = False
+    
+    async def receive():
+        nonlocal requested
+        if requested:
+            # The client stays connected until the body is done
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            on_chunk(message.get("body", b""))
+    
+    headers = [(name.lower().encode(), value.encode()) for name, value in auth_headers(user_id).items()]
+    await app(
+        {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": query.encode(), "headers": headers,
+            "client": ("127.0.0.1", 1), "server": ("test", 80)
+        },
+        receive,
+        send
+    )
+    return status_code
+
+
+@pytest.mark.parametrize("query", ["format=ndjson&dataset=all", "format=csv&dataset=checkins"])
+async def test_export_streams_in_batches(db, query):
+    seed_history(SMALL_EXPORT_ROWS)
+    chunks = []
+    
+    assert await stream_get("/api/export/", query, 1, chunks.append) == 200
+    
+    lines = sum(chunk.count(b"\n") for chunk in chunks)
+    if query.endswith("all"):
+        # Habits and check-ins, the user has no point records
+        assert lines == HABITS + SMALL_EXPORT_ROWS
+    else:
+        assert lines == SMALL_EXPORT_ROWS + 1
+    # Sent a batch at a time rather than as one body
+    assert len([chunk for chunk in chunks if chunk]) >= SMALL_EXPORT_ROWS // EXPORT_BATCH_SIZE
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="reads RSS from /proc")
+@pytest.mark.parametrize("query", ["format=ndjson&dataset=checkins", "format=csv&dataset=checkins"])
+async def test_export_streams_a_million_rows_in_constant_memory(db, query):
+    seed_history(EXPORT_ROWS)
+    gc.collect()
+    baseline = peak = current_rss()
+    lines = 0
+    
+    def on_chunk(body: bytes):
+        nonlocal lines, peak
+        lines += body.count(b"\n")
+        peak = max(peak, current_rss())
+    
+    assert await stream_get("/api/export/", query, 1, on_chunk) == 200
+    # Every check-in, plus the header row of a CSV
+    assert lines == EXPORT_ROWS + query.startswith("format=csv")
+    assert peak - baseline < RSS_CEILING_BYTES
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import event
+from datetime import date, timedelta
+from app.database import async_engine
+from tests.conftest import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_user_with_habits(factory, openid: str, habit_count: int) -> int:
+    """A user with habits checked in on each of the last five days, returns the user id"""
+    user = await factory.user(openid)
+    habits = await factory.habits(user, habit_count)
+    for habit in habits:
+        await factory.checkins(habit, [date.today() - timedelta(days=days_ago) for days_ago in range(5)])
+    await factory.stats(habits)
+    return user.id
+
+
+async def count_statements(client, path: str, user_id: int) -> int:
+    """SQL statements executed while serving a GET request"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = await client.get(path, headers=auth_headers(user_id))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+async def test_get_habits_query_count_does_not_grow_with_habits(factory, client):
+    one_habit = await create_user_with_habits(factory, "one-habit", 1)
+    twenty_habits = await create_user_with_habits(factory, "twenty-habits", 20)
+    
+    single = await count_statements(client, "/api/habits/", one_habit)
+    many = await count_statements(client, "/api/habits/", twenty_habits)
+    
+    # The user row and one habits-with-stats query, whatever the number of habits
+    assert many == single
+    assert many == 2
+
+
+async def test_get_habits_reports_stats(factory, client):
+    user_id = await create_user_with_habits(factory, "stats", 20)
+    
+    response = await client.get("/api/habits/", headers=auth_headers(user_id))
+    
+    habits = response.json()
+    assert len(habits) == 20
+    assert all(habit["total_checkins"] == 5 for habit in habits)
+    assert all(habit["current_streak"] == 5 for habit in habits)
+
+
+async def test_update_habit_changes_only_the_fields_sent(factory, client):
+    user_id = await create_user_with_habits(factory, "update", 1)
+    headers = auth_headers(user_id)
+    habit_id = (await client.get("/api/habits/", headers=headers)).json()[0]["id"]
+    
+    response = await client.put(f"/api/habits/{habit_id}", json={"description": "new"}, headers=headers)
+    
+    assert response.status_code == 200
+    assert response.json()["name"] == "habit 0"
+    assert response.json()["description"] == "new"
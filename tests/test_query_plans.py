@@ -0,0 +1,83 @@
+import os
+import time
+import httpx
+import pytest
+from alembic import command
+from alembic.config import Config
+from pathlib import Path
+from datetime import date, timedelta
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.main import app
+from app.services.upload_gc import UploadGCService
+from app.utils.query_plans import QueryRecorder, explain_all, hot_requests, request_all
+from app.utils.storage import LocalStorage, image_key
+from tests.conftest import Factory, auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def migrated_db():
+    """Session on the schema the migrations build, dropped again after the test"""
+    config = Config()
+    config.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
+    command.upgrade(config, "head")
+    
+    async with AsyncSessionLocal() as session:
+        yield session
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.exec_driver_sql("DROP TABLE alembic_version")
+    await async_engine.dispose()
+
+
+async def test_hot_endpoints_do_not_scan_whole_tables(migrated_db, tmp_path):
+    factory = Factory(migrated_db)
+    user = await factory.user()
+    # Enough points for a makeup check-in
+    user.points = 1000
+    await migrated_db.commit()
+    habits = await factory.habits(user, count=3)
+    today = date.today()
+    for habit in habits:
+        await factory.checkins(habit, [today - timedelta(days=days_ago) for days_ago in range(2, 40, 2)])
+    await factory.stats(habits)
+    
+    # An old upload for garbage collection to look up
+    backend = LocalStorage(root=str(tmp_path))
+    path = backend.local_path(image_key("0123abcd.jpg"))
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"image")
+    os.utime(path, (time.time() - 2 * 86400,) * 2)
+    
+    headers = auth_headers(user.id)
+    with QueryRecorder(async_engine) as recorder:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # Write paths first, so the reads also see today's rows
+            response = await client.post(
+                "/api/checkins/",
+                json={"habit_id": habits[0].id, "checkin_date": today.isoformat()},
+                headers=headers
+            )
+            assert response.status_code == 200
+            response = await client.post(
+                "/api/checkins/batch",
+                json={"items": [{"habit_id": habit.id, "checkin_date": today.isoformat()} for habit in habits[1:]]},
+                headers=headers
+            )
+            assert response.status_code == 200
+            response = await client.post(
+                "/api/checkins/makeup",
+                json={"habit_id": habits[0].id, "checkin_date": (today - timedelta(days=1)).isoformat()},
+                headers=headers
+            )
+            assert response.status_code == 200
+            
+            await request_all(client, hot_requests(habits[0].id), user.id)
+        
+        await UploadGCService(migrated_db, backend, str(tmp_path)).collect_images(timedelta(hours=24), dry_run=True)
+    
+    results = await explain_all(async_engine, recorder.statements)
+    assert len(results) > 20
+    assert {statement: scanned for statement, scanned in results.items() if scanned} == {}
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import update
+from datetime import date
+from app.models.user import User
+from app.services.stats_cache import stats_cache
+from tests.conftest import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+async def overview(client, user_id: int) -> dict:
+    response = await client.get("/api/statistics/overview", headers=auth_headers(user_id))
+    assert response.status_code == 200
+    return response.json()
+
+
+async def set_points(db, user_id: int, points: int):
+    """Change a user behind the app's back, so only a recompute can see it"""
+    await db.execute(update(User).where(User.id == user_id).values(points=points))
+    await db.commit()
+
+
+async def test_repeated_reads_are_served_from_the_cache(db, factory, client, redis):
+    user = await factory.user()
+    
+    first = await overview(client, user.id)
+    await set_points(db, user.id, 50)
+    
+    assert await overview(client, user.id) == first
+    assert await stats_cache.get_counters() == {"overview:miss": 1, "overview:hit": 1}
+
+
+async def test_check_in_invalidates_cached_statistics(db, factory, client, redis):
+    habit = await factory.habit(await factory.user())
+    assert (await overview(client, habit.user_id))["total_checkins"] == 0
+    
+    response = await client.post(
+        "/api/checkins/",
+        json={"habit_id": habit.id, "checkin_date": date.today().isoformat()},
+        headers=auth_headers(habit.user_id)
+    )
+    assert response.status_code == 200
+    
+    assert (await overview(client, habit.user_id))["total_checkins"] == 1
+
+
+async def test_spending_points_invalidates_cached_statistics(db, factory, client, redis):
+    user = await factory.user(points=150)
+    assert (await overview(client, user.id))["total_points"] == 150
+    
+    response = await client.post(
+        "/api/points/exchange", json={"reward_id": "badge_bronze"}, headers=auth_headers(user.id)
+    )
+    assert response.status_code == 200
+    
+    assert (await overview(client, user.id))["total_points"] == 50
+
+
+async def test_habit_writes_invalidate_cached_habit_statistics(db, factory, client, redis):
+    user = await factory.user()
+    headers = auth_headers(user.id)
+    assert (await client.get("/api/statistics/habits", headers=headers)).json() == []
+    
+    response = await client.post("/api/habits/", json={"name": "read"}, headers=headers)
+    assert response.status_code == 200
+    
+    habits = (await client.get("/api/statistics/habits", headers=headers)).json()
+    assert [habit["habit_name"] for habit in habits] == ["read"]
+
+
+async def test_statistics_are_computed_directly_without_redis(db, factory, client):
+    user = await factory.user()
+    assert (await overview(client, user.id))["total_points"] == 0
+    
+    await set_points(db, user.id, 50)
+    
+    assert (await overview(client, user.id))["total_points"] == 50
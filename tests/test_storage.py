@@ -0,0 +1,89 @@
+import boto3
+import pytest
+from moto import mock_aws
+from sqlalchemy import select
+from datetime import date
+from app.models.checkin import Checkin
+from app.models.stored_image import StoredImage
+from app.models.user import User
+from app.services.storage_migration import PATH_COLUMNS, StorageMigrationService
+from app.utils.storage import IMMUTABLE_CACHE_CONTROL, S3Storage, image_key
+
+pytestmark = pytest.mark.anyio
+
+BUCKET = "habit-uploads"
+
+
+@pytest.fixture
+def s3():
+    """S3Storage on an in-memory bucket"""
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(
+            bucket=BUCKET,
+            endpoint_url=None,
+            region="us-east-1",
+            access_key_id="test",
+            secret_access_key="test",
+            public_url="https://cdn.example.com"
+        )
+
+
+async def test_s3_storage_round_trip(s3, tmp_path):
+    key = image_key("abcdef.jpg")
+    source = tmp_path / "upload.jpg"
+    source.write_bytes(b"image bytes")
+    
+    assert not await s3.exists(key)
+    await s3.save(key, source)
+    assert not source.exists()
+    assert await s3.exists(key)
+    assert s3.url(key) == "https://cdn.example.com/images/ab/cd/abcdef.jpg"
+    
+    head = s3.client.head_object(Bucket=BUCKET, Key=key)
+    assert (head["ContentType"], head["CacheControl"]) == ("image/jpeg", IMMUTABLE_CACHE_CONTROL)
+    
+    await s3.touch(key)
+    assert [(stored.key, stored.size) for stored in s3.iter_files("images/")] == [(key, len(b"image bytes"))]
+    
+    await s3.download(key, tmp_path / "copy.jpg")
+    assert (tmp_path / "copy.jpg").read_bytes() == b"image bytes"
+    
+    await s3.delete(key)
+    assert not await s3.exists(key)
+    assert list(s3.iter_files("images/")) == []
+
+
+async def test_migration_moves_flat_files_to_s3_and_rewrites_paths(db, factory, s3, tmp_path):
+    flat_dir = tmp_path / "images"
+    flat_dir.mkdir()
+    for name in ("checkin.jpg", "avatar.png"):
+        (flat_dir / name).write_bytes(name.encode())
+    
+    user = await factory.user(avatar="uploads/images/avatar.png")
+    habit = await factory.habit(user)
+    await factory.checkin(habit, date(2024, 1, 1), image="uploads/images/checkin.jpg")
+    await factory.checkin(habit, date(2024, 1, 2), image="https://example.com/elsewhere.jpg")
+    db.add(StoredImage(hash="checkin", path="uploads/images/checkin.jpg", ref_count=1))
+    await db.commit()
+    
+    service = StorageMigrationService(db, s3, str(tmp_path))
+    assert await service.copy_files() == 2
+    # Files already in the bucket are not copied again
+    assert await service.copy_files() == 0
+    for key_column, path_column in PATH_COLUMNS:
+        await service.rewrite_paths(key_column, path_column)
+    assert await service.remove_flat_files() == 2
+    
+    assert list(flat_dir.iterdir()) == []
+    assert s3.client.get_object(Bucket=BUCKET, Key=image_key("checkin.jpg"))["Body"].read() == b"checkin.jpg"
+    
+    images = (await db.execute(
+        select(Checkin.image, Checkin.image_name).order_by(Checkin.checkin_date).execution_options(populate_existing=True)
+    )).all()
+    assert images == [
+        ("https://cdn.example.com/images/ch/ec/checkin.jpg", "checkin.jpg"),
+        ("https://example.com/elsewhere.jpg", "elsewhere.jpg"),
+    ]
+    assert await db.scalar(select(User.avatar)) == "https://cdn.example.com/images/av/at/avatar.png"
+    assert await db.scalar(select(StoredImage.path)) == "https://cdn.example.com/images/ch/ec/checkin.jpg"
@@ -0,0 +1,141 @@
+import random
+import pytest
+from sqlalchemy import select
+from datetime import date, timedelta
+from app.models.checkin import Checkin
+from app.models.habit_stats import HabitStat
+from app.services.habit_stats_service import HabitStatsService, get_current_streak
+
+pytestmark = pytest.mark.anyio
+
+
+async def loop_current_streak(db, habit_id: int, today: date) -> int:
+    """The per-day loop the streak query replaced, one SELECT per day"""
+    streak = 0
+    current_date = today
+    
+    while True:
+        checkin = await db.scalar(
+            select(Checkin).where(
+                Checkin.habit_id == habit_id,
+                Checkin.checkin_date == current_date
+            ).limit(1)
+        )
+        
+        if checkin:
+            streak += 1
+            current_date -= timedelta(days=1)
+        else:
+            break
+    
+    return streak
+
+
+async def loop_longest_streak(db, habit_id: int) -> int:
+    """The longest streak scan the streak query replaced"""
+    dates = (await db.scalars(
+        select(Checkin.checkin_date).where(Checkin.habit_id == habit_id).order_by(Checkin.checkin_date)
+    )).all()
+    
+    if not dates:
+        return 0
+    
+    longest_streak = 0
+    current_streak = 1
+    
+    for i in range(1, len(dates)):
+        if (dates[i] - dates[i - 1]).days == 1:
+            current_streak += 1
+        else:
+            longest_streak = max(longest_streak, current_streak)
+            current_streak = 1
+    
+    return max(longest_streak, current_streak)
+
+
+def random_history(rng: random.Random, today: date):
+    """Check-in dates with runs and gaps of random length, some dated after today"""
+    density = rng.choice([0.0, 0.2, 0.5, 0.8, 0.95, 1.0])
+    span = rng.randint(1, 200)
+    dates = [
+        today + timedelta(days=offset)
+        for offset in range(-span, 1)
+        if rng.random() < density
+    ]
+    # Check-ins ahead of today, right after it or past a gap
+    ahead = rng.choice([1, 1, 2, 5, 70])
+    return dates + [today + timedelta(days=ahead + offset) for offset in range(rng.choice([0, 0, 1, 3]))]
+
+
+async def create_habits(factory, histories):
+    """One user with a habit per history, returns the habit ids"""
+    user = await factory.user()
+    habits = await factory.habits(user, len(histories))
+    for habit, dates in zip(habits, histories):
+        await factory.checkins(habit, dates)
+    return [habit.id for habit in habits]
+
+
+@pytest.mark.parametrize("seed", range(5))
+async def test_streaks_match_per_day_loop(db, factory, seed):
+    rng = random.Random(seed)
+    today = date.today()
+    histories = [random_history(rng, today) for _ in range(25)]
+    habit_ids = await create_habits(factory, histories)
+    
+    service = HabitStatsService(db)
+    stats = await service.recompute(habit_ids)
+    streaks = await service.get_current_streaks(stats.values(), today)
+    
+    for habit_id, dates in zip(habit_ids, histories):
+        assert stats[habit_id].total_checkins == len(dates)
+        assert streaks[habit_id] == await loop_current_streak(db, habit_id, today)
+        assert stats[habit_id].longest_streak == await loop_longest_streak(db, habit_id)
+
+
+@pytest.mark.parametrize("days_ahead", [2, 30, 61, 62, 100])
+async def test_long_streak_before_a_future_checkin(db, factory, days_ahead):
+    today = date.today()
+    habit = await factory.habit(await factory.user())
+    await factory.checkins(habit, [today - timedelta(days=days_ago) for days_ago in range(100)])
+    await factory.checkin(habit, today + timedelta(days=days_ahead))
+    
+    service = HabitStatsService(db)
+    stats = (await service.recompute([habit.id]))[habit.id]
+    
+    # The stats row only keeps 62 days before the future check-in, too few to tell
+    assert get_current_streak(stats, today) is None
+    assert await service.get_current_streak(stats, today) == 100
+
+
+async def test_incremental_updates_match_recompute(db, factory):
+    rng = random.Random(42)
+    today = date.today()
+    histories = [random_history(rng, today) for _ in range(10)]
+    habit_ids = await create_habits(factory, [[] for _ in histories])
+    
+    service = HabitStatsService(db)
+    await service.recompute(habit_ids)
+    await db.commit()
+    
+    # Check-ins arrive one at a time, mostly in date order with the odd late one
+    for habit_id, dates in zip(habit_ids, histories):
+        if len(dates) > 3:
+            dates[-3], dates[-1] = dates[-1], dates[-3]
+        for day in dates:
+            db.add(Checkin(habit_id=habit_id, user_id=1, checkin_date=day))
+            await db.flush()
+            await service.record_checkin(habit_id, day)
+            await db.commit()
+    
+    incremental = {
+        stats.habit_id: (stats.total_checkins, stats.last_checkin_date, stats.last_streak, stats.longest_streak, stats.recent_days)
+        for stats in await db.scalars(
+            select(HabitStat).execution_options(populate_existing=True)
+        )
+    }
+    recomputed = {
+        habit_id: (stats.total_checkins, stats.last_checkin_date, stats.last_streak, stats.longest_streak, stats.recent_days)
+        for habit_id, stats in (await service.recompute(habit_ids)).items()
+    }
+    assert incremental == recomputed
@@ -0,0 +1,49 @@
+import os
+import time
+import uuid
+import pytest
+from datetime import date, timedelta
+from app.services.upload_gc import UploadGCService
+from app.services.user_service import UserService
+from app.utils.storage import LocalStorage, image_key
+
+pytestmark = pytest.mark.anyio
+
+
+def old_file(backend: LocalStorage) -> str:
+    """An image written two days ago, returns its key"""
+    key = image_key(f"{uuid.uuid4().hex}.jpg")
+    path = backend.local_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"image")
+    two_days_ago = time.time() - 2 * 86400
+    os.utime(path, (two_days_ago, two_days_ago))
+    return key
+
+
+async def test_gc_keeps_files_referenced_under_any_prefix(db, factory, tmp_path):
+    backend = LocalStorage(root=str(tmp_path))
+    current, host_prefixed, older_url, unreferenced = [old_file(backend) for _ in range(4)]
+    
+    user = await factory.user(avatar=f"https://cdn.example.com/{backend.url(host_prefixed)}")
+    habit = await factory.habit(user)
+    await factory.checkin(habit, date(2024, 1, 1), image=backend.url(current))
+    await factory.checkin(habit, date(2024, 1, 2), image=f"/static/images/{older_url.rsplit('/', 1)[-1]}")
+    
+    report = await UploadGCService(db, backend, str(tmp_path)).collect_images(timedelta(hours=24))
+    
+    assert (report.scanned, report.deleted) == (4, 1)
+    assert [await backend.exists(key) for key in (current, host_prefixed, older_url, unreferenced)] == [True, True, True, False]
+
+
+async def test_avatar_file_name_follows_login_profile_updates(db):
+    service = UserService(db)
+    user, _ = await service.login("openid", avatar="https://cdn.example.com/uploads/images/ab/cd/abcd.jpg")
+    assert user.avatar_name == "abcd.jpg"
+    
+    # A login without an avatar keeps the stored one and its name
+    user, _ = await service.login("openid", nickname="new name")
+    assert (user.avatar, user.avatar_name) == ("https://cdn.example.com/uploads/images/ab/cd/abcd.jpg", "abcd.jpg")
+    
+    user, _ = await service.login("openid", avatar="uploads/images/ef/01/ef01.png")
+    assert user.avatar_name == "ef01.png"
@@ -0,0 +1,105 @@
+import hashlib
+import pytest
+from sqlalchemy import update
+from datetime import timedelta
+from app.api import auth as auth_api
+from app.config import settings
+from app.models.user import User
+from app.utils import auth
+from app.utils.auth import create_access_token, verify_token
+from tests.conftest import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def token_cache():
+    auth._token_cache.clear()
+    yield auth._token_cache
+    auth._token_cache.clear()
+
+
+async def me(client, user_id: int) -> dict:
+    response = await client.get("/api/auth/me", headers=auth_headers(user_id))
+    assert response.status_code == 200
+    return response.json()
+
+
+async def rename(db, user_id: int, nickname: str):
+    """Change a user behind the app's back, so only a database read can see it"""
+    await db.execute(update(User).where(User.id == user_id).values(nickname=nickname))
+    await db.commit()
+
+
+async def test_user_is_served_from_its_snapshot(db, factory, client, redis):
+    user = await factory.user(nickname="old")
+    assert (await me(client, user.id))["nickname"] == "old"
+    
+    await rename(db, user.id, "new")
+    
+    assert (await me(client, user.id))["nickname"] == "old"
+
+
+async def test_login_with_a_new_profile_invalidates_the_snapshot(db, factory, client, redis, monkeypatch):
+    async def get_wechat_openid(code: str):
+        return "user"
+    
+    monkeypatch.setattr(auth_api, "get_wechat_openid", get_wechat_openid)
+    user = await factory.user(nickname="old")
+    assert (await me(client, user.id))["nickname"] == "old"
+    
+    response = await client.post("/api/auth/login", json={"code": "code", "nickname": "new"})
+    assert response.status_code == 200
+    
+    assert (await me(client, user.id))["nickname"] == "new"
+
+
+async def test_spending_points_invalidates_the_snapshot(db, factory, client, redis):
+    user = await factory.user(points=150)
+    assert (await me(client, user.id))["points"] == 150
+    
+    response = await client.post(
+        "/api/points/exchange", json={"reward_id": "badge_bronze"}, headers=auth_headers(user.id)
+    )
+    assert response.status_code == 200
+    
+    assert (await me(client, user.id))["points"] == 50
+
+
+async def test_user_is_read_from_the_database_without_redis(db, factory, client):
+    user = await factory.user(nickname="old")
+    assert (await me(client, user.id))["nickname"] == "old"
+    
+    await rename(db, user.id, "new")
+    
+    assert (await me(client, user.id))["nickname"] == "new"
+
+
+def test_verified_token_is_cached_until_it_expires(token_cache, monkeypatch):
+    token = create_access_token({"sub": "1"}, timedelta(minutes=1))
+    assert verify_token(token) == {"user_id": "1"}
+    
+    # A cached token is not decoded again
+    def decode(*args, **kwargs):
+        raise auth.JWTError("decoded")
+    
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    assert verify_token(token) == {"user_id": "1"}
+    
+    [(_, expires_at)] = token_cache.values()
+    monkeypatch.setattr(auth.time, "time", lambda: expires_at + 1)
+    assert verify_token(token) is None
+    assert not token_cache
+
+
+def test_token_cache_evicts_the_least_recently_used_token(token_cache, monkeypatch):
+    monkeypatch.setattr(settings, "token_cache_size", 2)
+    first, second, third = [create_access_token({"sub": str(user_id)}) for user_id in (1, 2, 3)]
+    
+    verify_token(first)
+    verify_token(second)
+    verify_token(first)
+    verify_token(third)
+    
+    assert len(token_cache) == 2
+    assert hashlib.sha256(second.encode()).hexdigest() not in token_cache
@@ -0,0 +1,89 @@
+import asyncio
+import socket
+import pytest
+from fastapi import HTTPException
+from app.utils import auth
+from app.utils.wechat import WeChatClient
+from tests.fake_wechat import FakeWeChat
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fake():
+    with FakeWeChat() as fake:
+        yield fake
+
+
+@pytest.fixture
+async def wechat(fake):
+    client = WeChatClient(base_url=fake.base_url, read_timeout=1.0, retries=2)
+    yield client
+    await client.aclose()
+
+
+async def test_concurrent_logins_with_one_code_share_a_request(fake, wechat):
+    fake.latency = 0.2
+    
+    openids = await asyncio.gather(*[wechat.code_to_openid("shared") for _ in range(10)])
+    
+    assert openids == ["openid-shared"] * 10
+    assert fake.calls["shared"] == 1
+
+
+async def test_exchanged_codes_are_answered_from_cache_until_they_expire(fake, wechat):
+    assert await wechat.code_to_openid("abc") == "openid-abc"
+    assert await wechat.code_to_openid("abc") == "openid-abc"
+    assert fake.calls["abc"] == 1
+    
+    wechat.cache_ttl = 0
+    assert await wechat.code_to_openid("expiring") == "openid-expiring"
+    assert await wechat.code_to_openid("expiring") == "openid-expiring"
+    assert fake.calls["expiring"] == 2
+
+
+async def test_busy_answers_are_retried(fake, wechat):
+    busy = {"errcode": -1, "errmsg": "system error"}
+    fake.answers["busy"] = [busy, busy]
+    fake.answers["always-busy"] = [busy, busy, busy]
+    
+    assert await wechat.code_to_openid("busy") == "openid-busy"
+    assert fake.calls["busy"] == 3
+    assert await wechat.code_to_openid("always-busy") is None
+    assert fake.calls["always-busy"] == 3
+
+
+async def test_rejected_codes_are_not_retried_or_cached(fake, wechat):
+    fake.answers["used"] = [{"errcode": 40163, "errmsg": "code been used"}]
+    
+    assert await wechat.code_to_openid("used") is None
+    assert fake.calls["used"] == 1
+    assert await wechat.code_to_openid("used") == "openid-used"
+
+
+@pytest.mark.parametrize("failure", ["http error", "timeout", "refused"])
+async def test_unavailable_wechat_is_a_503(fake, wechat, failure):
+    if failure == "http error":
+        fake.answers["code"] = [502]
+    elif failure == "timeout":
+        fake.latency = 2.0
+    else:
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            wechat.base_url = f"http://127.0.0.1:{closed.getsockname()[1]}"
+    
+    with pytest.raises(HTTPException) as raised:
+        await wechat.code_to_openid("code")
+    assert raised.value.status_code == 503
+
+
+async def test_login_reports_an_unavailable_wechat_as_503(db, client, fake, wechat, monkeypatch):
+    fake.answers["code"] = [500]
+    monkeypatch.setattr(auth, "wechat_client", wechat)
+    
+    response = await client.post("/api/auth/login", json={"code": "code"})
+    assert response.status_code == 503
+    
+    response = await client.post("/api/auth/login", json={"code": "code"})
+    assert response.status_code == 200
+    assert response.json()["user"]["openid"] == "openid-code"